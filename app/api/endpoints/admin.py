@@ -0,0 +1,52 @@
+import hmac
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
+
+from app.profiling import request_profiler
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Доступ по токену PROFILING_ADMIN_TOKEN; без токена эндпоинтов нет."""
+    token = request_profiler.admin_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode(), token.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+    include_in_schema=False,
+)
+
+
+@router.get("/profiles")
+def list_profiles() -> List[Dict[str, Any]]:
+    """Сохранённые профили запросов, новые первыми"""
+    return [profile.summary() for profile in request_profiler.recent()]
+
+
+@router.get("/profiles/{correlation_id}")
+def get_profile(
+    correlation_id: str,
+    format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+):
+    """Профиль запроса: collapsed stacks (текст) или файл pstats"""
+    profile = request_profiler.get(correlation_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            profile.pstats(),
+            media_type="application/octet-stream",
+            headers={
+                "Content-Disposition": f'attachment; filename="{correlation_id}.pstats"'
+            },
+        )
+    return PlainTextResponse(profile.collapsed())
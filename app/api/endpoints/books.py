@@ -1,13 +1,41 @@
-from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Iterable, Iterator, List, Optional
 
-from app.schemas.book import BookCreate, BookStatusUpdate, BookUpdate
-from app.storage.database import db
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.api.serialization import encode_book, encode_books, json_bytes_response
+from app.audit import audit
+from app.middleware.error_handler import ItemsValidationError
+from app.schemas.book import (
+    BookCreate,
+    BookStatusBatchItem,
+    BookStatusUpdate,
+    BookUpdate,
+)
+from app.storage.cache import normalize_search_query
+from app.storage.database import (
+    STATUS_NOT_FOUND,
+    BookStorage,
+    InMemoryBook,
+    get_storage,
+    search_cache,
+)
+from app.storage.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+)
 
 router = APIRouter(prefix="/api/v1/books", tags=["books"])
 
-# Временное хранилище в памяти (для демо)
-books_db = []
-current_id = 1
+# Размер пачки при потоковой выдаче списка книг
+STREAM_BATCH_SIZE = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Максимум книг в одном запросе POST /bulk
+MAX_BULK_ITEMS = 1000
 
 # === THREAT MODELING P04 - ВАЛИДАЦИЯ СТАТУСОВ ===
 
@@ -33,112 +61,261 @@ def validate_status_transition(current_status: str, new_status: str) -> None:
         )
 
 
+def book_etag(book: InMemoryBook) -> str:
+    """Сильный ETag книги: id и версия (updated_at меняется при каждой записи)."""
+    return f'"{book.id}-{book.updated_at:%Y%m%d%H%M%S%f}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Совпадает ли ETag с If-None-Match (слабое сравнение, RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _stream_books(books: Iterable[InMemoryBook], ndjson: bool) -> Iterator[bytes]:
+    """Сериализовать книги по одной: NDJSON или JSON-массив."""
+    if ndjson:
+        for book in books:
+            yield encode_book(book) + b"\n"
+        return
+
+    yield b"["
+    separator = b""
+    for book in books:
+        yield separator + encode_book(book)
+        separator = b","
+    yield b"]"
+
+
 # Возращаем все книги из списка.
 @router.get("/")
-def get_books():
-    """Получить список всех книг"""
-    return books_db
+def get_books(
+    request: Request,
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"
+    ),
+    cursor: Optional[str] = Query(
+        None, max_length=200, description="Курсор из заголовка X-Next-Cursor"
+    ),
+    stream: bool = Query(False, description="Отдавать полный список потоком"),
+    storage: BookStorage = Depends(get_storage),
+):
+    """Получить список книг.
+
+    Без параметров возвращает все книги. С ``limit``/``cursor`` работает
+    keyset-пагинация по id; курсор следующей страницы приходит в заголовке
+    ``X-Next-Cursor`` (нет заголовка — страниц больше нет).
+
+    ``stream=true`` или ``Accept: application/x-ndjson`` отдают полный список
+    потоком (JSON-массив или NDJSON), не собирая тело ответа в памяти.
+
+    Тело собирается из закешированных JSON-фрагментов книг (см.
+    ``app.api.serialization``). ETag строится по поколению хранилища: на совпавший ``If-None-Match``
+    отвечаем 304, не читая книги и не сериализуя тело.
+    """
+    ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    # Поколение читаем до данных: запись между ними лишь даст лишний 200
+    etag = f'"{storage.generation()}-{"ndjson" if ndjson else "json"}"'
+    headers = {"ETag": etag, "Vary": "Accept"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if (stream or ndjson) and limit is None and cursor is None:
+        return StreamingResponse(
+            _stream_books(storage.iter_books(STREAM_BATCH_SIZE), ndjson),
+            media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json",
+            headers=headers,
+        )
+
+    if limit is None and cursor is None:
+        return json_bytes_response(encode_books(storage.get_all_books()), headers)
+
+    try:
+        after_id = decode_cursor(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+    # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+    books = storage.get_books_page(after_id, page_size + 1)
+    if len(books) > page_size:
+        books = books[:page_size]
+        headers["X-Next-Cursor"] = encode_cursor(books[-1].id)
+    return json_bytes_response(encode_books(books), headers)
 
 
 @router.get("/search")
 def search_books(
-    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос")
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+    storage: BookStorage = Depends(get_storage),
 ):
-    """Поиск книг по названию или автору."""
-    try:
-        if db.backend == "sql":
-            found_books = db.search_books(q)
-            result = []
-            for book in found_books:
-                result.append(
-                    {
-                        "id": book.id,
-                        "title": book.title,
-                        "author": book.author,
-                        "description": book.description,
-                        "status": book.status,
-                        "created_at": (
-                            book.created_at.isoformat() if book.created_at else None
-                        ),
-                        "updated_at": (
-                            book.updated_at.isoformat() if book.updated_at else None
-                        ),
-                    }
-                )
-            return result
-        else:
-            # In-memory фильтрация
-            query_lower = q.lower()
-            result = []
-            for book in books_db:
-                if (
-                    query_lower in book.get("title", "").lower()
-                    or query_lower in book.get("author", "").lower()
-                ):
-                    result.append(book)
-            return result
-    except Exception:
-        raise HTTPException(
-            status_code=500, detail="An error occurred while searching for books"
-        )
+    """Поиск книг по названию или автору.
+
+    Готовое тело ответа кешируется по нормализованному запросу до следующего
+    изменения хранилища (см. ``SearchCache``).
+    """
+    query = normalize_search_query(q)
+    if not query:
+        # Запрос из одних пробелов не должен выдавать всю библиотеку
+        return []
+    generation = storage.generation()
+    body = search_cache.get(query, generation)
+    if body is None:
+        try:
+            books = storage.search_books(query)
+        except Exception:
+            raise HTTPException(
+                status_code=500, detail="An error occurred while searching for books"
+            )
+        body = encode_books(books)
+        search_cache.put(query, generation, body)
+    return json_bytes_response(body)
 
 
 # Looking for a book by id.
 @router.get("/{book_id}")
-def get_book(book_id: int):
-    """Получить книгу по ID"""
-    book = next((b for b in books_db if b["id"] == book_id), None)
+def get_book(
+    book_id: int,
+    request: Request,
+    storage: BookStorage = Depends(get_storage),
+):
+    """Получить книгу по ID (с поддержкой If-None-Match)"""
+    book = storage.get_book_by_id(book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    etag = book_etag(book)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return json_bytes_response(encode_book(book), {"ETag": etag})
 
 
 # Add a new book.
 @router.post("/")
-def create_book(book_data: BookCreate):
+def create_book(book_data: BookCreate, storage: BookStorage = Depends(get_storage)):
     """Добавить новую книгу"""
-    global current_id
-
-    # Создаём новую книгу — поля валидирует Pydantic (BookCreate)
-    new_book = {
-        "id": current_id,
-        "title": book_data.title,
-        "author": book_data.author,
-        "description": book_data.description,
-        "status": "to_read",
-    }
+    # Поля валидирует Pydantic (BookCreate)
+    book = storage.create_book(
+        title=book_data.title,
+        author=book_data.author,
+        description=book_data.description,
+    )
+    return json_bytes_response(encode_book(book))
+
 
-    books_db.append(new_book)
-    current_id += 1
-    return new_book
+# Add many books at once.
+@router.post("/bulk")
+def bulk_create_books(
+    items: List[Any] = Body(..., max_length=MAX_BULK_ITEMS),
+    partial: bool = Query(
+        False, description="Сохранить валидные книги, даже если есть невалидные"
+    ),
+    storage: BookStorage = Depends(get_storage),
+):
+    """Массовое добавление книг.
+
+    Все элементы валидируются за один проход по схеме ``BookCreate``. Если есть
+    ошибки и ``partial`` не задан — не сохраняется ничего (422). Ответ содержит
+    id в порядке входных элементов (``null`` для отклонённых) и ошибки по индексам.
+    """
+    valid: List[BookCreate] = []
+    positions: List[int] = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            valid.append(BookCreate.model_validate(item))
+            positions.append(index)
+        except ValidationError as exc:
+            # Только место и текст ошибки — входные данные обратно не отражаем
+            errors.append(
+                {
+                    "index": index,
+                    "errors": [
+                        {"loc": list(err["loc"]), "msg": err["msg"]}
+                        for err in exc.errors()
+                    ],
+                }
+            )
+
+    if errors and not partial:
+        # RFC 7807 с расширением errors формирует общий обработчик валидации
+        raise ItemsValidationError(errors, "One or more books failed validation")
+
+    # Все валидные книги сохраняются одной транзакцией
+    created = storage.bulk_create_books([book_data.model_dump() for book_data in valid])
+    ids: List[Optional[int]] = [None] * len(items)
+    for index, book in zip(positions, created):
+        ids[index] = book.id
+    return {"ids": ids, "errors": errors}
 
 
 # Updating info about the book.
 @router.put("/{book_id}")
-def update_book(book_id: int, book_data: BookUpdate):
+def update_book(
+    book_id: int, book_data: BookUpdate, storage: BookStorage = Depends(get_storage)
+):
     """Обновить информацию о книге"""
-    book = next((b for b in books_db if b["id"] == book_id), None)
+    # Обновляем поля (BookUpdate содержит optional поля, None не трогаем)
+    book = storage.update_book(
+        book_id,
+        title=book_data.title,
+        author=book_data.author,
+        description=book_data.description,
+    )
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
+    return json_bytes_response(encode_book(book))
+
+
+# Updating status of many books at once.
+# Регистрируется раньше /{book_id}/status, иначе "bulk" попадёт в book_id.
+@router.patch("/bulk/status")
+def bulk_update_book_status(
+    items: List[BookStatusBatchItem] = Body(..., max_length=MAX_BULK_ITEMS),
+    storage: BookStorage = Depends(get_storage),
+):
+    """Пакетное изменение статусов с валидацией переходов.
 
-    # Обновляем поля (BookUpdate содержит optional поля)
-    if book_data.title is not None:
-        book["title"] = book_data.title
-    if book_data.author is not None:
-        book["author"] = book_data.author
-    if book_data.description is not None:
-        book["description"] = book_data.description
+    Элементы применяются по порядку за один проход хранилища (одна блокировка
+    в памяти, один UPDATE в SQL), так что несколько переходов одной книги в
+    пакете (to_read → in_progress → completed) проверяются последовательно.
+    Результат — по элементу на вход с кодом, который вернул бы одиночный PATCH.
+    """
+    changes = [(item.id, item.status.value) for item in items]
+    # === THREAT MODELING P04 - ВАЛИДАЦИЯ ПЕРЕХОДОВ ===
+    outcomes = storage.update_statuses(changes, validate_status_transition)
 
-    return book
+    results = []
+    for (book_id, new_status), outcome in zip(changes, outcomes):
+        if outcome is None:
+            # Аудит изменения статуса (NFR-009)
+            audit("status_change", book_id=book_id, new_status=new_status)
+            results.append({"id": book_id, "status_code": 200, "status": new_status})
+        elif outcome == STATUS_NOT_FOUND:
+            results.append(
+                {"id": book_id, "status_code": 404, "detail": "Book not found"}
+            )
+        else:
+            results.append({"id": book_id, "status_code": 400, "detail": outcome})
+    return results
 
 
 # Updating status.
 @router.patch("/{book_id}/status")
-def update_book_status(book_id: int, status_data: BookStatusUpdate):
+def update_book_status(
+    book_id: int,
+    status_data: BookStatusUpdate,
+    storage: BookStorage = Depends(get_storage),
+):
     """Изменить статус прочтения с валидацией переходов"""
-    book = next((b for b in books_db if b["id"] == book_id), None)
+    book = storage.get_book_by_id(book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
+    old_status = book.status
+    new_status = status_data.status.value
 
     # status_data.status уже валидирован как Enum (BookStatus)
     valid_statuses = ["to_read", "in_progress", "completed"]
@@ -148,29 +325,32 @@ def update_book_status(book_id: int, status_data: BookStatusUpdate):
         )
 
     # === THREAT MODELING P04 - ВАЛИДАЦИЯ ПЕРЕХОДОВ ===
-    try:
-        validate_status_transition(book["status"], status_data.status)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    # Проверка и запись выполняются хранилищем атомарно
+    (outcome,) = storage.update_statuses(
+        [(book_id, new_status)], validate_status_transition
+    )
+    if outcome == STATUS_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if outcome is not None:
+        raise HTTPException(status_code=400, detail=outcome)
 
     # Логируем изменение статуса для аудита (NFR-009)
-    print(
-        f"АУДИТ: Книга {book_id} изменила статус с {book['status']} на {status_data.status}"
+    audit(
+        "status_change",
+        book_id=book_id,
+        old_status=old_status,
+        new_status=new_status,
     )
 
-    book["status"] = status_data.status
-    return book
+    return json_bytes_response(encode_book(storage.get_book_by_id(book_id)))
 
 
 # Deleting the book.
 @router.delete("/{book_id}")
-def delete_book(book_id: int):
+def delete_book(book_id: int, storage: BookStorage = Depends(get_storage)):
     """Удалить книгу"""
-    global books_db
-
-    book_index = next((i for i, b in enumerate(books_db) if b["id"] == book_id), None)
-    if book_index is None:
+    book = storage.get_book_by_id(book_id)
+    if not book or not storage.delete_book(book_id):
         raise HTTPException(status_code=404, detail="Book not found")
 
-    deleted_book = books_db.pop(book_index)
-    return {"message": f"Book '{deleted_book['title']}' deleted successfully"}
+    return {"message": f"Book '{book.title}' deleted successfully"}
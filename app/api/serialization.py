@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import Response
+
+from app.storage.base import InMemoryBook
+
+# Сколько закодированных книг держать в памяти (0 — кодировать всегда заново)
+BOOK_JSON_CACHE_SIZE = int(os.getenv("BOOK_JSON_CACHE_SIZE", "100000"))
+
+
+def book_to_dict(book: InMemoryBook) -> Dict[str, Any]:
+    """Представление книги в ответах API."""
+    return {
+        "id": book.id,
+        "title": book.title,
+        "author": book.author,
+        "description": book.description,
+        "status": book.status,
+        "created_at": book.created_at.isoformat() if book.created_at else None,
+        "updated_at": book.updated_at.isoformat() if book.updated_at else None,
+    }
+
+
+def dumps(content: Any) -> bytes:
+    """JSON так же, как его рендерит fastapi.responses.JSONResponse."""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class BookJSONCache:
+    """Закодированный JSON книг по id, с версией ``updated_at``.
+
+    Любая запись меняет ``updated_at``, так что устаревший фрагмент просто не
+    совпадёт по версии — явная инвалидация не нужна, и кеш одинаково работает
+    для обоих бэкендов (SQL отдаёт новые объекты на каждый запрос).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[int, Tuple[Optional[datetime], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, book: InMemoryBook) -> bytes:
+        # Версию читаем до кодирования: параллельная запись in-memory книги
+        # может дать фрагмент новее версии, но никогда не старее
+        version = book.updated_at
+        with self._lock:
+            entry = self._data.get(book.id)
+            if entry is not None and entry[0] == version:
+                self._data.move_to_end(book.id)
+                return entry[1]
+
+        encoded = dumps(book_to_dict(book))
+        if self.maxsize > 0:
+            with self._lock:
+                self._data[book.id] = (version, encoded)
+                self._data.move_to_end(book.id)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return encoded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+book_json_cache = BookJSONCache(BOOK_JSON_CACHE_SIZE)
+
+
+def encode_book(book: InMemoryBook) -> bytes:
+    return book_json_cache.encode(book)
+
+
+def encode_books(books: Iterable[InMemoryBook]) -> bytes:
+    """JSON-массив книг, склеенный из закешированных фрагментов."""
+    return b"[" + b",".join(map(book_json_cache.encode, books)) + b"]"
+
+
+def json_bytes_response(
+    body: bytes, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Готовое JSON-тело без повторного jsonable_encoder/json.dumps."""
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,187 @@
+"""Аудит-журнал (NFR-009): структурированные записи JSON Lines.
+
+Запрос только кладёт запись в ограниченную очередь; форматирование и запись
+выполняет фоновый поток пачками, так что медленный stdout или диск не
+попадает в латентность запросов.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+# Куда писать: "stdout" или путь к файлу (ротируется по размеру)
+AUDIT_SINK = os.getenv("AUDIT_SINK", "stdout")
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "256"))
+# При переполнении очереди: drop — отбросить запись, block — ждать места
+# (только вне event loop: в async-коде запись отбрасывается, как при drop)
+AUDIT_OVERFLOW = os.getenv("AUDIT_OVERFLOW", "drop")
+AUDIT_MAX_BYTES = int(os.getenv("AUDIT_MAX_BYTES", str(10 * 1024 * 1024)))
+AUDIT_BACKUP_COUNT = int(os.getenv("AUDIT_BACKUP_COUNT", "5"))
+
+_STOP = object()
+
+
+class AuditSink:
+    """Ограниченная очередь аудит-записей с фоновым писателем.
+
+    Писатель забирает из очереди всё накопившееся (до ``batch_size``) и пишет
+    одной операцией. Счётчики ``stats()`` показывают, сколько записей
+    принято, записано и отброшено при переполнении.
+    """
+
+    def __init__(
+        self,
+        target: str = "stdout",
+        *,
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        overflow: str = "drop",
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+    ):
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Unknown audit overflow policy: {overflow}")
+        self.target = target
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._handler: Optional[RotatingFileHandler] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @classmethod
+    def from_env(cls) -> "AuditSink":
+        return cls(
+            AUDIT_SINK,
+            queue_size=AUDIT_QUEUE_SIZE,
+            batch_size=AUDIT_BATCH_SIZE,
+            overflow=AUDIT_OVERFLOW,
+            max_bytes=AUDIT_MAX_BYTES,
+            backup_count=AUDIT_BACKUP_COUNT,
+        )
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Поставить запись в очередь; False — запись отброшена.
+
+        Политика ``block`` ждёт места только в потоках без event loop (пул
+        потоков синхронных эндпоинтов): блокировка цикла остановила бы все
+        запросы, поэтому из async-кода запись при переполнении отбрасывается.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put(record, block=self._may_block())
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped += 1
+            return False
+        with self._counter_lock:
+            self.submitted += 1
+        return True
+
+    def _may_block(self) -> bool:
+        if self.overflow != "block":
+            return False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return True
+        return False
+
+    def close(self) -> None:
+        """Дописать очередь и остановить писателя (следующий submit запустит снова)."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join()
+            self._thread = None
+            if self._handler is not None:
+                self._handler.close()
+                self._handler = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "queued": self._queue.qsize(),
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            # Забираем всё, что накопилось, не дожидаясь новых записей
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        text = "\n".join(json.dumps(record, default=str) for record in batch)
+        if self.target == "stdout":
+            try:
+                # sys.stdout берём на момент записи: его могут подменить
+                sys.stdout.write(text + "\n")
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                return
+        else:
+            if self._handler is None:
+                self._handler = RotatingFileHandler(
+                    self.target,
+                    maxBytes=self.max_bytes,
+                    backupCount=self.backup_count,
+                    encoding="utf-8",
+                )
+            self._handler.emit(logging.makeLogRecord({"msg": text}))
+        self.written += len(batch)
+        self.batches += 1
+
+
+audit_sink = AuditSink.from_env()
+
+
+def audit(event: str, **fields: Any) -> bool:
+    """Записать аудит-событие; вызывающий поток не ждёт записи."""
+    record = {"timestamp": datetime.utcnow().isoformat() + "Z", "event": event}
+    record.update(fields)
+    return audit_sink.submit(record)
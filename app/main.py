@@ -1,21 +1,60 @@
 import logging
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.api.endpoints import books
-from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.api.endpoints import admin, books
+from app.audit import audit, audit_sink
+from app.metrics import REGISTRY, stats_gauges
+from app.middleware.error_handler import ErrorHandlerMiddleware, ItemsValidationError
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.profiling import request_profiler
+from app.storage.database import db, search_cache
 
-app = FastAPI(title="SecDev Course App", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Для SQL-бэкенда создаём схему (и FTS-индекс), если её ещё нет
+    db.init_schema()
+    yield
+    # Дописываем накопленные аудит-записи перед остановкой
+    audit_sink.close()
+
+
+app = FastAPI(title="SecDev Course App", version="0.1.0", lifespan=lifespan)
 
 # Настройка логгера по умолчанию для аудита
 logging.basicConfig(level=logging.INFO)
 
 
+# Профилирование по токену администратора; выключенное не стоит ничего —
+# middleware просто не подключается. Внутри ErrorHandlerMiddleware, чтобы
+# профиль сохранялся под его correlation_id
+if request_profiler.enabled:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
 app.add_middleware(ErrorHandlerMiddleware)
+# Внешний слой: латентность и коды ответов с учётом обработки ошибок
+app.add_middleware(MetricsMiddleware)
+
+
+def _runtime_stats():
+    """Статистика кешей и очереди аудита для /metrics."""
+    lines = stats_gauges("search_cache", "Search result cache", search_cache.stats())
+    store = db
+    while store is not None:
+        if hasattr(store, "cache_stats"):
+            lines += stats_gauges("book_cache", "Book by id cache", store.cache_stats())
+        store = getattr(store, "inner", None)
+    lines += stats_gauges("audit", "Audit log queue", audit_sink.stats())
+    return lines
+
+
+REGISTRY.register_collector(_runtime_stats)
 
 # используем встроенные exception handlers
 
@@ -23,7 +62,7 @@ app.add_middleware(ErrorHandlerMiddleware)
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Обработчик ошибок валидации в формате RFC 7807"""
-    correlation_id = str(uuid.uuid4())
+    correlation_id = getattr(request.state, "correlation_id", None) or str(uuid.uuid4())
 
     problem_details = {
         "type": "https://api.readinglist.com/errors/validation-error",
@@ -35,14 +74,19 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
 
-    logging.getLogger("app.audit").info("AUDIT_ERROR: %s", problem_details)
+    if isinstance(exc, ItemsValidationError):
+        problem_details["detail"] = exc.detail
+    audit("error", **problem_details)
+    if isinstance(exc, ItemsValidationError):
+        # Расширение RFC 7807: ошибки по индексам элементов (в аудит не пишем)
+        problem_details["errors"] = exc.errors()
     return JSONResponse(status_code=422, content=problem_details)
 
 
 @app.exception_handler(404)
 async def not_found_exception_handler(request: Request, exc: Exception):
     """Обработчик 404 ошибок в формате RFC 7807"""
-    correlation_id = str(uuid.uuid4())
+    correlation_id = getattr(request.state, "correlation_id", None) or str(uuid.uuid4())
 
     problem_details = {
         "type": "https://api.readinglist.com/errors/not-found",
@@ -54,14 +98,14 @@ async def not_found_exception_handler(request: Request, exc: Exception):
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
 
-    logging.getLogger("app.audit").info("AUDIT_ERROR: %s", problem_details)
+    audit("error", **problem_details)
     return JSONResponse(status_code=404, content=problem_details)
 
 
 @app.exception_handler(500)
 async def internal_error_exception_handler(request: Request, exc: Exception):
     """Обработчик 500 ошибок в формате RFC 7807"""
-    correlation_id = str(uuid.uuid4())
+    correlation_id = getattr(request.state, "correlation_id", None) or str(uuid.uuid4())
 
     problem_details = {
         "type": "https://api.readinglist.com/errors/internal-error",
@@ -73,12 +117,13 @@ async def internal_error_exception_handler(request: Request, exc: Exception):
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
 
-    logging.getLogger("app.audit").info("AUDIT_ERROR: %s", problem_details)
+    audit("error", **problem_details)
     return JSONResponse(status_code=500, content=problem_details)
 
 
 # Подключаем роутеры для книг
 app.include_router(books.router)
+app.include_router(admin.router)
 
 
 @app.get("/health")
@@ -86,6 +131,14 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 _DB = {"items": []}
 
 
@@ -0,0 +1,240 @@
+"""Метрики приложения в текстовом формате Prometheus, без внешних зависимостей.
+
+Запись идёт без блокировок: у каждого потока свой шард значений, а при
+выдаче ``/metrics`` шарды суммируются. Блокировка берётся только при первом
+обращении потока к метрике.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, TypeVar
+
+# Границы корзин гистограмм латентности (секунды), как у клиентов Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+MetricT = TypeVar("MetricT", bound="_Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """Метрика с метками; значения лежат в шардах по потокам."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Labels, object]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Labels, object]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self) -> List[Dict[Labels, object]]:
+        with self._lock:
+            shards = list(self._shards)
+        # Копия dict атомарна под GIL — писатели не мешают обходу
+        return [dict(shard) for shard in shards]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        merged: Dict[Labels, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, value in sorted(self.values().items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} "
+                f"{_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    """Сумма inc/dec по всем потокам (например, запросы в обработке)."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels: str, value: float) -> None:
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # Счётчики по корзинам (последняя — +Inf), затем сумма
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def render(self) -> List[str]:
+        merged: Dict[Labels, List[float]] = {}
+        for shard in self._snapshots():
+            for labels, entry in shard.items():
+                total = merged.setdefault(labels, [0] * len(entry))
+                for i, value in enumerate(list(entry)):
+                    total[i] += value
+
+        lines = super().render()
+        for labels, entry in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), entry[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                label_str = _format_labels((*self.labelnames, "le"), (*labels, le))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(entry[-1])}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+# Коллектор возвращает готовые строки — для метрик, которые проще снять
+# в момент выдачи (статистика кешей, очереди аудита)
+Collector = Callable[[], Iterable[str]]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        self.collectors: List[Collector] = []
+
+    def register(self, metric: MetricT) -> MetricT:
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Collector) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def stats_gauges(prefix: str, help: str, stats: Dict[str, float]) -> List[str]:
+    """Словарь stats() (кеши, очереди) как набор gauge ``{prefix}_{ключ}``."""
+    lines = []
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        lines += [
+            f"# HELP {name} {help}: {key}",
+            f"# TYPE {name} gauge",
+            f"{name} {_format_value(value)}",
+        ]
+    return lines
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route template and status code",
+        ("method", "route", "status"),
+    )
+)
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template",
+        ("method", "route"),
+    )
+)
+HTTP_IN_FLIGHT = REGISTRY.register(
+    Gauge("http_requests_in_flight", "HTTP requests being processed")
+)
+STORAGE_OPERATION_DURATION = REGISTRY.register(
+    Histogram(
+        "storage_operation_duration_seconds",
+        "Book storage operation latency",
+        ("backend", "operation"),
+    )
+)
+RATE_LIMIT_REJECTIONS = REGISTRY.register(
+    Counter(
+        "rate_limit_rejections_total",
+        "Requests rejected by the rate limiter",
+        ("budget",),
+    )
+)
+SQL_QUERY_DURATION = REGISTRY.register(
+    Histogram(
+        "sql_query_duration_seconds",
+        "SQL statement latency by statement kind",
+        ("statement",),
+    )
+)
+SQL_SLOW_QUERIES = REGISTRY.register(
+    Counter(
+        "sql_slow_queries_total",
+        "SQL statements slower than the slow-query threshold",
+        ("statement",),
+    )
+)
+SQL_QUERIES_PER_REQUEST = REGISTRY.register(
+    Histogram(
+        "sql_queries_per_request",
+        "SQL statements executed per HTTP request",
+        buckets=(1, 2, 5, 10, 20, 50, 100, 250),
+    )
+)
+SQL_N_PLUS_ONE = REGISTRY.register(
+    Counter(
+        "sql_n_plus_one_total",
+        "SQL statements repeated within a request above the N+1 threshold",
+    )
+)
@@ -1,12 +1,14 @@
-import logging
 import uuid
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from fastapi import HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.audit import audit
+from app.storage.query_log import track_queries
 
 
 class ProblemDetailsException(HTTPException):
@@ -28,57 +30,89 @@ class ProblemDetailsException(HTTPException):
         self.headers = headers or {}
 
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
-    """Middleware для обработки ошибок по RFC 7807"""
+class ItemsValidationError(RequestValidationError):
+    """Ошибки валидации элементов пакета по индексам.
 
-    async def dispatch(self, request: Request, call_next):
-        try:
-            # Генерируем correlation_id для запроса
-            correlation_id = str(uuid.uuid4())
-            request.state.correlation_id = correlation_id
+    Обработчик ``RequestValidationError`` добавляет их в ответ как расширение
+    ``errors``; входные данные в ошибках не отражаются.
+    """
+
+    def __init__(self, errors: List[Dict[str, Any]], detail: str):
+        super().__init__(errors)
+        self.detail = detail
+
+
+class ErrorHandlerMiddleware:
+    """ASGI-middleware для обработки ошибок по RFC 7807.
+
+    Чистый ASGI, а не BaseHTTPMiddleware: без лишней задачи и memory-stream
+    на каждый запрос, потоковые ответы проходят без буферизации.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-            response = await call_next(request)
-            return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        except ProblemDetailsException as exc:
-            return self._create_problem_response(request, exc)
-        except HTTPException as exc:
+        # Генерируем correlation_id для запроса (доступен как request.state)
+        correlation_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            # SQL-запросы обработки попадут в метрики и slow-query log с этим id
+            with track_queries(correlation_id):
+                await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if response_started:
+                # Заголовки уже ушли клиенту — заменить ответ нельзя
+                raise
+            request = Request(scope)
+            response = self._create_problem_response(
+                request, self._to_problem(request, exc)
+            )
+            await response(scope, receive, send)
+
+    def _to_problem(self, request: Request, exc: Exception) -> ProblemDetailsException:
+        """Привести исключение к ProblemDetailsException"""
+        if isinstance(exc, ProblemDetailsException):
+            return exc
+        if isinstance(exc, HTTPException):
             # ПЕРЕХВАТЫВАЕМ ВСЕ HTTPException и конвертируем в RFC 7807
-            return self._create_problem_response(
-                request,
-                ProblemDetailsException(
-                    status_code=exc.status_code,
-                    detail=exc.detail,
-                    title=self._get_title_for_status(exc.status_code),
-                    type=self._get_type_for_status(exc.status_code),
-                    instance=request.url.path,
-                    headers=exc.headers,
-                ),
+            return ProblemDetailsException(
+                status_code=exc.status_code,
+                detail=exc.detail,
+                title=self._get_title_for_status(exc.status_code),
+                type=self._get_type_for_status(exc.status_code),
+                instance=request.url.path,
+                headers=exc.headers,
             )
-        except RequestValidationError:
+        if isinstance(exc, RequestValidationError):
             # Обработка ошибок валидации Pydantic
-            return self._create_problem_response(
-                request,
-                ProblemDetailsException(
-                    status_code=422,
-                    detail="Validation error",
-                    title="Validation Error",
-                    type="https://api.readinglist.com/errors/validation-error",
-                    instance=request.url.path,
-                ),
-            )
-        except Exception:
-            # В production не раскрываем детали внутренних ошибок
-            return self._create_problem_response(
-                request,
-                ProblemDetailsException(
-                    status_code=500,
-                    detail="Internal Server Error",
-                    title="Internal Server Error",
-                    type="https://api.readinglist.com/errors/internal-error",
-                    instance=request.url.path,
-                ),
+            return ProblemDetailsException(
+                status_code=422,
+                detail="Validation error",
+                title="Validation Error",
+                type="https://api.readinglist.com/errors/validation-error",
+                instance=request.url.path,
             )
+        # В production не раскрываем детали внутренних ошибок
+        return ProblemDetailsException(
+            status_code=500,
+            detail="Internal Server Error",
+            title="Internal Server Error",
+            type="https://api.readinglist.com/errors/internal-error",
+            instance=request.url.path,
+        )
 
     def _create_problem_response(
         self, request: Request, exc: ProblemDetailsException
@@ -113,8 +147,7 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
             "error_type": problem_details["type"],
             "client_ip": request.client.host if request.client else "unknown",
         }
-        logger = logging.getLogger("app.audit")
-        logger.info("AUDIT_ERROR: %s", log_data)
+        audit("error", **log_data)
 
     def _get_title_for_status(self, status_code: int) -> str:
         """Получить заголовок для HTTP статуса"""
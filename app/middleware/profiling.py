@@ -0,0 +1,54 @@
+import hmac
+import random
+import uuid
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.profiling import RequestProfiler
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware профилирования запросов (см. ``app.profiling``).
+
+    Запрос профилируется, если в заголовке X-Profile передан токен
+    администратора или он попал в долю ``sample_rate``. Профиль сохраняется
+    под correlation_id из ``ErrorHandlerMiddleware`` (поэтому middleware
+    подключается внутри него), id профиля возвращается в X-Profile-Id.
+    В приложение добавляется, только если профилирование включено.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+        self._token = profiler.admin_token.encode()
+
+    def _requested(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self._token)
+        sample_rate = self.profiler.sample_rate
+        return sample_rate > 0 and random.random() < sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        correlation_id = state.setdefault("correlation_id", str(uuid.uuid4()))
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, correlation_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profile = self.profiler.start(correlation_id, scope["method"], scope["path"])
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.stop(profile)
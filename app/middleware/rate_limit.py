@@ -1,85 +1,168 @@
+import math
+import re
 import time
 import uuid
-from typing import Dict, List
+from typing import List, Optional, Sequence, Tuple
 
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from app.metrics import RATE_LIMIT_REJECTIONS
+from app.middleware.rate_limit_backends import (
+    Limits,
+    RateLimitBackend,
+    create_rate_limit_backend,
+)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+
+class RouteCost:
+    """Вес запросов к маршруту и, необязательно, отдельный бюджет на окно.
+
+    Маршрут задаётся методом ("*" — любой) и регулярным выражением пути.
+    Маршруты с одинаковым ``name`` делят один бюджет.
+    """
+
+    __slots__ = ("method", "pattern", "cost", "name", "budget")
 
     def __init__(
         self,
-        app,
+        method: str,
+        path: str,
+        cost: float = 1,
+        name: Optional[str] = None,
+        budget: Optional[float] = None,
+    ):
+        if budget is not None and (name is None or budget < cost):
+            raise ValueError("Route budget needs a name and must cover one request")
+        self.method = method
+        self.pattern = re.compile(path)
+        self.cost = cost
+        self.name = name
+        self.budget = budget
+
+    def matches(self, method: str, path: str) -> bool:
+        return self.method in ("*", method) and self.pattern.match(path) is not None
+
+    def capped(self, limit: float) -> "RouteCost":
+        """Копия, у которой вес и бюджет не превышают ``limit``."""
+        limit = max(limit, 1)
+        budget = None if self.budget is None else min(self.budget, limit)
+        return RouteCost(
+            self.method, self.pattern.pattern, min(self.cost, limit), self.name, budget
+        )
+
+
+# Дорогие маршруты быстрее расходуют бюджет клиента. Вес запроса в общем бюджете
+# берётся у первого совпавшего маршрута, а свои бюджеты списываются у всех
+# совпавших (каждый — своим весом)
+DEFAULT_ROUTE_COSTS: Tuple[RouteCost, ...] = (
+    # Пакетные операции — до MAX_BULK_ITEMS книг за запрос
+    RouteCost("POST", r"/api/v1/books/bulk$", cost=20, name="bulk", budget=100),
+    RouteCost("PATCH", r"/api/v1/books/bulk/status$", cost=20, name="bulk", budget=100),
+    # Поиск проходит по всей библиотеке
+    RouteCost("GET", r"/api/v1/books/search$", cost=5, name="search", budget=200),
+    # Полный список и потоковая выгрузка
+    RouteCost("GET", r"/api/v1/books/?$", cost=3),
+)
+
+
+class RateLimitMiddleware:
+    """ASGI-middleware ограничения частоты запросов по IP (ADR-003).
+
+    На каждый IP — счётчики скользящего окна, так что проверка и учёт стоят
+    O(1) при любом лимите. Запрос списывает вес своего маршрута (см.
+    ``RouteCost``, по умолчанию 1) с общего бюджета ``global_limit`` и с
+    бюджетов всех совпавших маршрутов; любой POST в /api/v1/books, включая
+    пакетный, дополнительно считается одним запросом в ``post_limit``.
+    Счётчики хранит ``backend``; по умолчанию он выбирается переменной
+    RATE_LIMIT_BACKEND (см. ``app.middleware.rate_limit_backends``).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
         *,
         window_seconds: int = 60,
         post_limit: int = 10,
-        global_limit: int = 1000
+        global_limit: int = 1000,
+        max_clients: int = 100_000,
+        backend: Optional[RateLimitBackend] = None,
+        route_costs: Optional[Sequence[RouteCost]] = None,
     ):
-        super().__init__(app)
+        self.app = app
         self.window = window_seconds
         self.post_limit = post_limit
         self.global_limit = global_limit
-        self.store: Dict[str, List[Dict]] = {}
-
-    async def dispatch(self, request: Request, call_next):
-        ip = request.client.host if request.client else "unknown"
-        now = time.time()
-
-        events = self.store.get(ip, [])
-        events = [e for e in events if e["t"] > now - self.window]
-
-        # count POSTs to /api/v1/books
-        post_events = [
-            e
-            for e in events
-            if e["method"] == "POST" and e["path"].startswith("/api/v1/books")
-        ]
-        if request.method == "POST" and request.url.path.startswith("/api/v1/books"):
-            if len(post_events) >= self.post_limit:
-                retry_after = (
-                    int((post_events[0]["t"] + self.window) - now)
-                    if post_events
-                    else self.window
-                )
-                correlation_id = str(uuid.uuid4())
-                return JSONResponse(
-                    status_code=429,
-                    content={
-                        "type": "https://api.readinglist.com/errors/too-many-requests",
-                        "title": "Too Many Requests",
-                        "status": 429,
-                        "detail": "Rate limit exceeded",
-                        "instance": request.url.path,
-                        "correlation_id": correlation_id,
-                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                    },
-                    headers={"Retry-After": str(retry_after)},
-                )
-
-        # global check
-        if len(events) >= self.global_limit:
-            retry_after = (
-                int((events[0]["t"] + self.window) - now) if events else self.window
-            )
-            correlation_id = str(uuid.uuid4())
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "type": "https://api.readinglist.com/errors/too-many-requests",
-                    "title": "Too Many Requests",
-                    "status": 429,
-                    "detail": "Rate limit exceeded",
-                    "instance": request.url.path,
-                    "correlation_id": correlation_id,
-                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                },
-                headers={"Retry-After": str(retry_after)},
+        if route_costs is None:
+            # Веса по умолчанию подгоняем под лимиты: конфигурации с маленьким
+            # global_limit, валидные до появления весов, должны работать
+            route_costs = [route.capped(global_limit) for route in DEFAULT_ROUTE_COSTS]
+        elif any(route.cost > global_limit for route in route_costs):
+            raise ValueError("Route cost exceeds global_limit")
+        posts = RouteCost("POST", r"/api/v1/books", name="posts")
+        # Бюджет задаём напрямую: post_limit=0 (POST запрещены) меньше веса
+        # запроса, и проверка RouteCost его бы не пропустила
+        posts.budget = post_limit
+        self.route_costs: List[RouteCost] = [*route_costs, posts]
+        self.backend = backend or create_rate_limit_backend(window_seconds, max_clients)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        ip = client[0] if client else "unknown"
+        limits = self._limits(scope["method"], scope["path"])
+
+        if self.backend.blocking:
+            rejection = await run_in_threadpool(
+                self.backend.acquire, ip, limits, time.time()
             )
+        else:
+            rejection = self.backend.acquire(ip, limits, time.time())
+        if rejection is not None:
+            budget, retry_after = rejection
+            RATE_LIMIT_REJECTIONS.inc(budget)
+            await self._reject(scope, receive, send, retry_after)
+            return
+
+        await self.app(scope, receive, send)
 
-        events.append({"t": now, "method": request.method, "path": request.url.path})
-        self.store[ip] = events
+    def _limits(self, method: str, path: str) -> Limits:
+        """Счётчики запроса: бюджеты совпавших маршрутов, затем общий."""
+        cost: Optional[float] = None
+        limits: List[Tuple[str, float, float]] = []
+        for route in self.route_costs:
+            if not route.matches(method, path):
+                continue
+            if cost is None:
+                cost = route.cost
+            if route.budget is not None and all(
+                name != route.name for name, _, _ in limits
+            ):
+                limits.append((route.name, route.budget, route.cost))
+        limits.append(("requests", self.global_limit, 1 if cost is None else cost))
+        return limits
 
-        response = await call_next(request)
-        return response
+    async def _reject(
+        self, scope: Scope, receive: Receive, send: Send, retry_after: float
+    ) -> None:
+        """Ответить 429 в формате RFC 7807 с Retry-After"""
+        correlation_id = str(uuid.uuid4())
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "type": "https://api.readinglist.com/errors/too-many-requests",
+                "title": "Too Many Requests",
+                "status": 429,
+                "detail": "Rate limit exceeded",
+                "instance": Request(scope).url.path,
+                "correlation_id": correlation_id,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            },
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,335 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+# Бэкенд счётчиков: memory — свой в каждом процессе, sqlite — общий файл для
+# всех воркеров хоста (uvicorn --workers N)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Файл счётчиков sqlite-бэкенда; по умолчанию рядом с базой книг. Каталог
+# должен принадлежать приложению: в общем /tmp файл заранее может создать
+# другой пользователь
+RATE_LIMIT_SQLITE_PATH = os.getenv(
+    "RATE_LIMIT_SQLITE_PATH", "./readinglist-ratelimit.db"
+)
+
+# Сколько строк (клиентов) удалять за одну транзакцию очистки
+SWEEP_BATCH = 500
+
+# (имя счётчика, лимит, вес запроса в этом счётчике) в порядке проверки
+Limits = Sequence[Tuple[str, float, float]]
+# (имя отказавшего счётчика, Retry-After в секундах)
+Rejection = Tuple[str, float]
+
+
+class SlidingWindowCounter:
+    """Счётчик скользящего окна за O(1) и фиксированную память.
+
+    Хранит только два фиксированных окна: текущее и предыдущее. Число событий
+    за последние ``window`` секунд оценивается как
+    ``previous * (доля предыдущего окна, ещё входящая в скользящее) + current``.
+    """
+
+    __slots__ = ("window", "start", "previous", "current")
+
+    def __init__(
+        self,
+        window: float,
+        start: float,
+        previous: float = 0.0,
+        current: float = 0.0,
+    ):
+        self.window = window
+        self.start = start
+        self.previous = previous
+        self.current = current
+
+    def _roll(self, now: float) -> None:
+        elapsed = now - self.start
+        if elapsed >= self.window:
+            windows = int(elapsed // self.window)
+            self.previous = self.current if windows == 1 else 0.0
+            self.current = 0.0
+            self.start += windows * self.window
+
+    def count(self, now: float) -> float:
+        self._roll(now)
+        weight = 1 - (now - self.start) / self.window
+        return self.previous * weight + self.current
+
+    def add(self, now: float, amount: float = 1) -> None:
+        self._roll(now)
+        self.current += amount
+
+    def retry_after(self, now: float, limit: float, cost: float = 1) -> float:
+        """Через сколько секунд оценка опустится до ``limit - cost``."""
+        self._roll(now)
+        target = limit - cost
+        if target < 0:
+            # Запрос не влезет никогда (лимит меньше веса) — ждать окно
+            return self.window
+        if self.current <= target:
+            # Ждём, пока вес предыдущего окна уменьшится
+            if self.previous <= 0:
+                return 0.0
+            offset = self.window * (1 - (target - self.current) / self.previous)
+            return max(0.0, self.start + offset - now)
+        # Текущее окно станет предыдущим и тоже должно "остыть"
+        next_start = self.start + self.window
+        return next_start + self.window * (1 - target / self.current) - now
+
+
+def _create_private_file(path: str) -> None:
+    """Создать файл с правами 0600 или убедиться, что существующий — наш.
+
+    Чужой файл (или симлинк) на месте счётчиков позволил бы другому
+    пользователю менять лимиты или ломать запросы — такой не открываем.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        stat = os.fstat(fd)
+        if hasattr(os, "getuid") and stat.st_uid != os.getuid():
+            raise PermissionError(f"Rate limit database {path} belongs to another user")
+        if stat.st_mode & 0o077 and hasattr(os, "fchmod"):
+            os.fchmod(fd, 0o600)
+    finally:
+        os.close(fd)
+
+
+def _acquire(
+    counters: Dict[str, SlidingWindowCounter], limits: Limits, now: float
+) -> Optional[Rejection]:
+    """Проверить лимиты по порядку и, если запрос во все влезает, учесть его."""
+    for name, limit, cost in limits:
+        counter = counters[name]
+        if counter.count(now) + cost > limit:
+            return name, counter.retry_after(now, limit, cost)
+    for name, _, cost in limits:
+        counters[name].add(now, cost)
+    return None
+
+
+class RateLimitBackend(ABC):
+    """Хранилище счётчиков rate limit."""
+
+    # True — acquire блокирует (ввод-вывод), middleware вызывает его в пуле
+    # потоков, а не в цикле событий
+    blocking = False
+
+    def __init__(self, window: float, max_clients: int):
+        self.window = window
+        self.max_clients = max_clients
+
+    @abstractmethod
+    def acquire(self, client: str, limits: Limits, now: float) -> Optional[Rejection]:
+        """Атомарно списать веса запроса со всех счётчиков клиента из ``limits``.
+
+        Если в какой-то счётчик запрос не влезает, ничего не списывается и
+        возвращается имя первого такого счётчика и Retry-After (секунды);
+        иначе None.
+        """
+
+
+class _ClientState:
+    __slots__ = ("last_seen", "counters")
+
+    def __init__(self, now: float):
+        self.last_seen = now
+        self.counters: Dict[str, SlidingWindowCounter] = {}
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Счётчики в памяти процесса.
+
+    Клиенты хранятся в порядке последнего обращения: простаивающие дольше
+    двух окон вытесняются с головы, а число отслеживаемых клиентов ограничено
+    ``max_clients`` (сверх него вытесняется давно не появлявшийся).
+    """
+
+    def __init__(self, window: float, max_clients: int):
+        super().__init__(window, max_clients)
+        self.clients: "OrderedDict[str, _ClientState]" = OrderedDict()
+
+    def acquire(self, client: str, limits: Limits, now: float) -> Optional[Rejection]:
+        state = self._client(client, now)
+        for name, _, _ in limits:
+            if name not in state.counters:
+                state.counters[name] = SlidingWindowCounter(self.window, now)
+        return _acquire(state.counters, limits, now)
+
+    def _client(self, client: str, now: float) -> _ClientState:
+        """Состояние клиента; попутно вытесняет простаивающих."""
+        clients = self.clients
+        # Голова — самые давние клиенты: снимаем, пока они простаивают
+        idle_before = now - 2 * self.window
+        while clients:
+            oldest = next(iter(clients.values()))
+            if oldest.last_seen >= idle_before:
+                break
+            clients.popitem(last=False)
+
+        state = clients.get(client)
+        if state is None:
+            state = clients[client] = _ClientState(now)
+            if len(clients) > self.max_clients:
+                clients.popitem(last=False)
+        else:
+            clients.move_to_end(client)
+            state.last_seen = now
+        return state
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """Счётчики в локальном SQLite-файле, общем для всех воркеров хоста.
+
+    Проверка и учёт выполняются в одной транзакции ``BEGIN IMMEDIATE``, так
+    что параллельные воркеры не превысят лимит вместе. Файл лучше держать на
+    tmpfs (/dev/shm): журнал WAL и ``synchronous=OFF`` — счётчикам не нужна
+    устойчивость к сбою питания. Простаивающих клиентов и превышение
+    ``max_clients`` раз в окно чистит фоновый поток (``sweep``) — не в
+    транзакции запроса.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, window: float, max_clients: int):
+        super().__init__(window, max_clients)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._stopped = threading.Event()
+
+    def _open(self) -> sqlite3.Connection:
+        # Файлы -wal и -shm SQLite создаёт с правами основного файла
+        _create_private_file(self.path)
+        conn = sqlite3.connect(
+            self.path, timeout=5, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            " client TEXT NOT NULL, name TEXT NOT NULL, start REAL NOT NULL,"
+            " previous REAL NOT NULL, current REAL NOT NULL,"
+            " last_seen REAL NOT NULL, PRIMARY KEY (client, name))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS rate_limit_last_seen ON rate_limit (last_seen)"
+        )
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        # Соединение и поток очистки не переживают fork: у каждого процесса свои
+        if self._conn is None or self._pid != os.getpid():
+            self._conn, self._pid = self._open(), os.getpid()
+            threading.Thread(
+                target=self._sweep_loop, name="rate-limit-sweeper", daemon=True
+            ).start()
+        return self._conn
+
+    def acquire(self, client: str, limits: Limits, now: float) -> Optional[Rejection]:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                counters = {
+                    name: SlidingWindowCounter(self.window, start, previous, current)
+                    for name, start, previous, current in conn.execute(
+                        "SELECT name, start, previous, current FROM rate_limit"
+                        " WHERE client = ?",
+                        (client,),
+                    )
+                }
+                for name, _, _ in limits:
+                    if name not in counters:
+                        counters[name] = SlidingWindowCounter(self.window, now)
+                rejection = _acquire(counters, limits, now)
+                conn.executemany(
+                    "INSERT INTO rate_limit"
+                    " (client, name, start, previous, current, last_seen)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (client, name) DO UPDATE SET"
+                    " start = excluded.start, previous = excluded.previous,"
+                    " current = excluded.current, last_seen = excluded.last_seen",
+                    [
+                        (client, name, c.start, c.previous, c.current, now)
+                        for name, c in counters.items()
+                    ],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return rejection
+
+    def close(self) -> None:
+        """Остановить поток очистки."""
+        self._stopped.set()
+
+    def _sweep_loop(self) -> None:
+        while not self._stopped.wait(self.window):
+            try:
+                self.sweep(time.time())
+            except sqlite3.Error:
+                # База занята или недоступна — попробуем в следующем окне
+                continue
+
+    def sweep(self, now: float) -> int:
+        """Удалить простаивающих клиентов и самых давних сверх ``max_clients``.
+
+        Удаляет пачками по SWEEP_BATCH в отдельных коротких транзакциях, чтобы
+        не держать блокировку записи, нужную запросам всех воркеров.
+        Возвращает число удалённых строк.
+        """
+        conn = self._open()
+        removed = 0
+        try:
+            idle_before = now - 2 * self.window
+            while True:
+                deleted = conn.execute(
+                    "DELETE FROM rate_limit WHERE rowid IN (SELECT rowid"
+                    " FROM rate_limit WHERE last_seen < ? LIMIT ?)",
+                    (idle_before, SWEEP_BATCH),
+                ).rowcount
+                removed += deleted
+                if deleted < SWEEP_BATCH:
+                    break
+
+            (clients,) = conn.execute(
+                "SELECT COUNT(DISTINCT client) FROM rate_limit"
+            ).fetchone()
+            excess = clients - self.max_clients
+            while excess > 0:
+                # Все счётчики клиента пишутся вместе с одним last_seen, так что
+                # обход индекса по last_seen идёт от самых давних клиентов
+                victims: Dict[str, None] = {}
+                rows = conn.execute("SELECT client FROM rate_limit ORDER BY last_seen")
+                for (client,) in rows:
+                    victims[client] = None
+                    if len(victims) == min(excess, SWEEP_BATCH):
+                        break
+                rows.close()
+                if not victims:
+                    break
+                placeholders = ",".join("?" * len(victims))
+                removed += conn.execute(
+                    f"DELETE FROM rate_limit WHERE client IN ({placeholders})",
+                    list(victims),
+                ).rowcount
+                excess -= len(victims)
+        finally:
+            conn.close()
+        return removed
+
+
+def create_rate_limit_backend(window: float, max_clients: int) -> RateLimitBackend:
+    """Бэкенд по RATE_LIMIT_BACKEND (memory или sqlite)."""
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitBackend(RATE_LIMIT_SQLITE_PATH, window, max_clients)
+    if RATE_LIMIT_BACKEND != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND}")
+    return MemoryRateLimitBackend(window, max_clients)
@@ -1,35 +1,91 @@
-from fastapi import Request
+from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
-class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware to limit maximum request body size in bytes.
+class _PayloadTooLarge(HTTPException):
+    """Тело превысило лимит при чтении.
+
+    HTTPException, чтобы FastAPI не превратил его в 400 "error parsing the body".
+    """
+
+    def __init__(self):
+        super().__init__(status_code=413, detail="Request payload is too large")
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware to limit maximum request body size in bytes.
     If exceeded — returns 413 Payload Too Large.
+
+    Заявленный Content-Length больше лимита отклоняется сразу, не читая тело.
+    Иначе лимит проверяется по мере прихода чанков ``http.request``: чанки
+    уходят приложению как есть, сам middleware тело не накапливает.
     """
 
-    def __init__(self, app, *, max_body_size: int = 1_000_000):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, *, max_body_size: int = 1_000_000):
+        self.app = app
         self.max_body_size = max_body_size
 
-    async def dispatch(self, request: Request, call_next):
-        if request.method in ("POST", "PUT", "PATCH"):
-            body = await request.body()
-            if body and len(body) > self.max_body_size:
-                return JSONResponse(
-                    status_code=413,
-                    content={
-                        "type": "https://api.readinglist.com/errors/payload-too-large",
-                        "title": "Payload Too Large",
-                        "status": 413,
-                        "detail": "Request payload is too large",
-                        "instance": request.url.path,
-                    },
-                )
-
-            async def receive():
-                return {"type": "http.request", "body": body}
-
-            request._receive = receive
-
-        return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = self._content_length(scope)
+        if content_length is not None and content_length > self.max_body_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    raise _PayloadTooLarge()
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if exceeded:
+                # Ответ приложения на оборванное тело заменяем своим 413
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not response_started:
+            await self._reject(scope, receive, send)
+
+    @staticmethod
+    def _content_length(scope: Scope):
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=413,
+            content={
+                "type": "https://api.readinglist.com/errors/payload-too-large",
+                "title": "Payload Too Large",
+                "status": 413,
+                "detail": "Request payload is too large",
+                "instance": Request(scope).url.path,
+            },
+        )
+        await response(scope, receive, send)
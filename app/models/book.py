@@ -10,6 +10,16 @@ class BookStatus(str, Enum):
 
 
 class Book:
+    __slots__ = (
+        "id",
+        "title",
+        "author",
+        "description",
+        "status",
+        "created_at",
+        "updated_at",
+    )
+
     def __init__(
         self,
         id: int,
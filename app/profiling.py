@@ -0,0 +1,215 @@
+"""Профилирование отдельных запросов по требованию администратора.
+
+Профиль снимает сэмплирующий профилировщик на stdlib: пока идёт хотя бы один
+профилируемый запрос, фоновый поток раз в ``interval`` секунд снимает стеки
+всех занятых потоков (``sys._current_frames``). Так в профиль попадают и
+синхронные эндпоинты, которые Starlette выполняет в пуле потоков, — cProfile
+видит только поток, в котором его включили.
+
+Профиль хранится под ``correlation_id`` запроса и отдаётся как collapsed
+stacks (для flamegraph.pl / speedscope) или как файл pstats. Одновременные
+запросы в профиле не разделяются: профилируйте на тихом стенде.
+"""
+
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Токен администратора: без него профилирование выключено полностью
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+# Доля запросов, профилируемых без заголовка X-Profile (0 — только по заголовку)
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+# Сколько последних профилей хранить
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+
+_MAX_STACK_DEPTH = 256
+
+# Кадр как в pstats: (файл, первая строка функции, имя функции)
+FrameKey = Tuple[str, int, str]
+Stack = Tuple[FrameKey, ...]
+
+# Верхние кадры простаивающих потоков: ожидание задачи или событий
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+}
+
+
+def _frame_key(code) -> FrameKey:
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _stack(frame) -> Optional[Stack]:
+    """Стек от корня к вершине; None — поток простаивает."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+        return None
+    keys: List[FrameKey] = []
+    while frame is not None and len(keys) < _MAX_STACK_DEPTH:
+        keys.append(_frame_key(frame.f_code))
+        frame = frame.f_back
+    keys.reverse()
+    return tuple(keys)
+
+
+class Profile:
+    """Сэмплы стеков одного запроса."""
+
+    def __init__(self, correlation_id: str, method: str, path: str, interval: float):
+        self.correlation_id = correlation_id
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.started = time.time()
+        self.duration = 0.0
+        self.samples: "Counter[Stack]" = Counter()
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "correlation_id": self.correlation_id,
+            "method": self.method,
+            "path": self.path,
+            "started": self.started,
+            "duration_ms": round(self.duration * 1000, 3),
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self) -> str:
+        """Строки ``кадр;кадр;... число_сэмплов`` (формат flamegraph.pl)."""
+        lines = []
+        for stack, count in sorted(self.samples.items()):
+            frames = ";".join(
+                f"{os.path.basename(filename)}:{name}" for filename, _, name in stack
+            )
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats(self) -> bytes:
+        """Профиль в формате файла pstats (``pstats.Stats(path)``).
+
+        Числа вызовов — это числа сэмплов, время — сэмплы * интервал.
+        """
+        stats: Dict[FrameKey, list] = {}
+
+        def entry(key: FrameKey) -> list:
+            if key not in stats:
+                # cc, nc, tt, ct, callers
+                stats[key] = [0, 0, 0.0, 0.0, {}]
+            return stats[key]
+
+        for stack, count in self.samples.items():
+            elapsed = count * self.interval
+            entry(stack[-1])[2] += elapsed
+            seen: Set[FrameKey] = set()
+            for i, key in enumerate(stack):
+                if key in seen:
+                    # Рекурсия: время кадра уже учтено выше по стеку
+                    continue
+                seen.add(key)
+                stat = entry(key)
+                stat[0] += count
+                stat[1] += count
+                stat[3] += elapsed
+                if i:
+                    callers = stat[4]
+                    cc, nc, tt, ct = callers.get(stack[i - 1], (0, 0, 0.0, 0.0))
+                    own = elapsed if i == len(stack) - 1 else 0.0
+                    callers[stack[i - 1]] = (
+                        cc + count,
+                        nc + count,
+                        tt + own,
+                        ct + elapsed,
+                    )
+        return marshal.dumps({key: tuple(value) for key, value in stats.items()})
+
+
+class RequestProfiler:
+    """Сэмплирующий профилировщик запросов и хранилище последних профилей.
+
+    Поток-сэмплер работает, только пока есть профилируемые запросы.
+    """
+
+    def __init__(
+        self,
+        admin_token: str = "",
+        *,
+        sample_rate: float = 0.0,
+        interval_ms: float = 5,
+        max_profiles: int = 50,
+    ):
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.max_profiles = max_profiles
+        self.profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self._active: Set[Profile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "RequestProfiler":
+        return cls(
+            PROFILING_ADMIN_TOKEN,
+            sample_rate=PROFILING_SAMPLE_RATE,
+            interval_ms=PROFILING_INTERVAL_MS,
+            max_profiles=PROFILING_MAX_PROFILES,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.admin_token)
+
+    def start(self, correlation_id: str, method: str, path: str) -> Profile:
+        profile = Profile(correlation_id, method, path, self.interval)
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        profile.duration = time.time() - profile.started
+        with self._lock:
+            self._active.discard(profile)
+            self.profiles[profile.correlation_id] = profile
+            self.profiles.move_to_end(profile.correlation_id)
+            while len(self.profiles) > self.max_profiles:
+                self.profiles.popitem(last=False)
+
+    def get(self, correlation_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self.profiles.get(correlation_id)
+
+    def recent(self) -> List[Profile]:
+        """Сохранённые профили, новые первыми."""
+        with self._lock:
+            return list(reversed(self.profiles.values()))
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            stacks = [
+                stack
+                for ident, frame in sys._current_frames().items()
+                if ident != own and (stack := _stack(frame)) is not None
+            ]
+            # Под блокировкой: остановленный профиль больше не меняется
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                for profile in self._active:
+                    profile.samples.update(stacks)
+            time.sleep(self.interval)
+
+
+request_profiler = RequestProfiler.from_env()
@@ -37,6 +37,11 @@ class BookStatusUpdate(BaseModel):
     status: BookStatus
 
 
+class BookStatusBatchItem(BaseModel):
+    id: int
+    status: BookStatus
+
+
 class BookSearchQuery(BaseModel):
     """Схема для валидации поискового запроса"""
 
@@ -0,0 +1,153 @@
+import sys
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Поля, значения которых сильно повторяются и потому интернируются
+INTERNED_FIELDS = ("author", "status")
+
+# Результат update_statuses для отсутствующей книги
+STATUS_NOT_FOUND = "not_found"
+
+# validate(current, new) бросает ValueError для запрещённого перехода статуса
+StatusValidator = Callable[[str, str], None]
+
+
+def intern_value(value):
+    """Интернировать строку; Enum-статусы хранятся как их строковое значение."""
+    if isinstance(value, Enum):
+        value = value.value
+    return sys.intern(value)
+
+
+class InMemoryBook:
+    """Модель книги, которую отдают все бэкенды хранилища.
+
+    ``__slots__`` убирает per-instance ``__dict__``, а повторяющиеся строки
+    (автор, статус) интернируются — на миллионах книг это в разы меньше памяти.
+    """
+
+    __slots__ = (
+        "id",
+        "title",
+        "author",
+        "description",
+        "status",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        title: str,
+        author: str,
+        description: Optional[str] = None,
+        status: str = "to_read",
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+    ):
+        self.id = id
+        self.title = title
+        self.author = intern_value(author)
+        self.description = description
+        self.status = intern_value(status)
+        self.created_at = created_at or datetime.now()
+        self.updated_at = updated_at or datetime.now()
+
+
+def apply_status_changes(
+    current: Dict[int, str],
+    changes: List[Tuple[int, str]],
+    validate: StatusValidator,
+) -> List[Optional[str]]:
+    """Проверить переходы статусов по порядку, обновляя ``current`` на месте."""
+    outcomes: List[Optional[str]] = []
+    for book_id, new_status in changes:
+        if book_id not in current:
+            outcomes.append(STATUS_NOT_FOUND)
+            continue
+        try:
+            validate(current[book_id], new_status)
+        except ValueError as exc:
+            outcomes.append(str(exc))
+            continue
+        current[book_id] = new_status
+        outcomes.append(None)
+    return outcomes
+
+
+class BookStorage(ABC):
+    """Интерфейс хранилища книг: его реализуют in-memory и SQL бэкенды."""
+
+    backend: str
+
+    def init_schema(self) -> None:
+        """Подготовить хранилище к работе (создать схему и т.п.)."""
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator["BookStorage"]:
+        """Единица работы: все вызовы внутри — одна транзакция хранилища.
+
+        По умолчанию (in-memory) транзакций нет и возвращается само хранилище.
+        """
+        yield self
+
+    @abstractmethod
+    def generation(self) -> int:
+        """Поколение хранилища: растёт при каждом изменении книг.
+
+        Начинается со значения ``time.time_ns()``, поэтому после перезапуска
+        или пересоздания базы не повторяет старые значения — на нём строится
+        ETag списка книг.
+        """
+
+    @abstractmethod
+    def get_all_books(self) -> List[InMemoryBook]: ...
+
+    @abstractmethod
+    def iter_books(self, batch_size: int = 500) -> Iterator[InMemoryBook]:
+        """Потоково обойти все книги по возрастанию id."""
+
+    @abstractmethod
+    def get_books_page(self, after_id: int, limit: int) -> List[InMemoryBook]:
+        """Keyset-страница: книги с id > after_id по возрастанию id."""
+
+    @abstractmethod
+    def get_book_by_id(self, book_id: int) -> Optional[InMemoryBook]: ...
+
+    @abstractmethod
+    def create_book(
+        self, title: str, author: str, description: Optional[str] = None
+    ) -> InMemoryBook: ...
+
+    @abstractmethod
+    def bulk_create_books(self, items: List[Dict]) -> List[InMemoryBook]:
+        """Создать несколько книг разом.
+
+        ``items`` — словари с title/author/description. Результат в том же
+        порядке, что и ``items``.
+        """
+
+    @abstractmethod
+    def update_book(self, book_id: int, **kwargs) -> Optional[InMemoryBook]:
+        """Обновить переданные (не None) поля книги."""
+
+    @abstractmethod
+    def update_statuses(
+        self, changes: List[Tuple[int, str]], validate: StatusValidator
+    ) -> List[Optional[str]]:
+        """Пакетно изменить статусы.
+
+        ``changes`` применяются по порядку. Возвращает по элементу на вход:
+        None — применено, STATUS_NOT_FOUND — книги нет, иначе текст ошибки.
+        """
+
+    @abstractmethod
+    def delete_book(self, book_id: int) -> bool: ...
+
+    @abstractmethod
+    def search_books(self, query: str) -> List[InMemoryBook]:
+        """Поиск книг по подстроке в названии или авторе без учёта регистра."""
@@ -0,0 +1,292 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+from app.storage.base import BookStorage, InMemoryBook, StatusValidator
+
+# Число счётчиков инвалидаций: ключи делят их по хешу, память не растёт с ключами
+INVALIDATION_STRIPES = 1024
+
+
+class LRUCache:
+    """Ограниченный LRU-кеш с TTL и счётчиками попаданий.
+
+    Потокобезопасен: эндпоинты выполняются в пуле потоков. ``invalidate``
+    увеличивает счётчик инвалидаций ключа (см. ``version``): read-through
+    читает его до чтения источника и передаёт в ``put``, и значение, которое
+    инвалидировали, пока его читали, в кеш не попадает.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = [0] * INVALIDATION_STRIPES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[object]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def version(self, key: Hashable) -> int:
+        """Счётчик инвалидаций ключа (общий с ключами той же полосы)."""
+        with self._lock:
+            return self._versions[hash(key) % INVALIDATION_STRIPES]
+
+    def put(self, key: Hashable, value: object, version: Optional[int] = None) -> None:
+        """Положить значение; с ``version`` — только если ключ с тех пор не
+        инвалидировали."""
+        with self._lock:
+            stripe = hash(key) % INVALIDATION_STRIPES
+            if version is not None and self._versions[stripe] != version:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._versions[hash(key) % INVALIDATION_STRIPES] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# hook(event) получает "hit", "miss", "eviction" или "invalidation"
+CacheHook = Callable[[str], None]
+
+
+def normalize_search_query(query: str) -> str:
+    """Ключ кеша поиска; поиск выполняется по нему же, так что ключ и результат
+    всегда согласованы (поиск и так без учёта регистра)."""
+    return query.strip().lower()
+
+
+class SearchCache:
+    """Кеш готовых тел ответа поиска по нормализованному запросу.
+
+    Записи принадлежат поколению хранилища: как только оно выросло (любая
+    запись), кеш целиком сбрасывается. Ограничен и числом записей, и суммарным
+    размером тел в байтах; вытесняются давно не использованные.
+    """
+
+    def __init__(
+        self, max_entries: int, max_bytes: int, hook: Optional[CacheHook] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hook = hook
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self._generation: Optional[int] = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _emit(self, events: List[str]) -> None:
+        if self.hook is not None:
+            for event in events:
+                self.hook(event)
+
+    def _sync_generation(self, generation: int, events: List[str]) -> bool:
+        """Сбросить кеш при новом поколении; False — запрос из старого поколения."""
+        if self._generation is not None and generation < self._generation:
+            return False
+        if generation != self._generation:
+            if self._data:
+                self.invalidations += 1
+                events.append("invalidation")
+            self._data.clear()
+            self._bytes = 0
+            self._generation = generation
+        return True
+
+    def get(self, query: str, generation: int) -> Optional[bytes]:
+        events: List[str] = []
+        with self._lock:
+            body = None
+            if self._sync_generation(generation, events):
+                body = self._data.get(query)
+            if body is None:
+                self.misses += 1
+                events.append("miss")
+            else:
+                self._data.move_to_end(query)
+                self.hits += 1
+                events.append("hit")
+        self._emit(events)
+        return body
+
+    def put(self, query: str, generation: int, body: bytes) -> None:
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return
+        events: List[str] = []
+        with self._lock:
+            if not self._sync_generation(generation, events):
+                return
+            old = self._data.pop(query, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._data[query] = body
+            self._bytes += len(body)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+                events.append("eviction")
+        self._emit(events)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CachedStorage(BookStorage):
+    """Read-through кеш книг по id поверх другого хранилища.
+
+    Записи инвалидируют затронутые id сразу после записи и ещё раз после
+    завершения единицы работы. Чтение с промахом запоминает счётчик
+    инвалидаций id до обращения к хранилищу и не кладёт значение, если id за
+    это время инвалидировали: иначе параллельный запрос мог бы положить в
+    кеш значение, прочитанное до нашего коммита, на весь TTL. Внутри единицы работы уже
+    изменённые книги читаются мимо кеша, чтобы видеть собственные записи.
+    Изменения из других процессов кеш не видит — их ограничивает TTL.
+    """
+
+    def __init__(
+        self,
+        inner: BookStorage,
+        cache: LRUCache,
+        touched: Optional[Set[int]] = None,
+    ):
+        self.inner = inner
+        self.cache = cache
+        self._touched = touched
+
+    @property
+    def backend(self) -> str:
+        return self.inner.backend
+
+    def init_schema(self) -> None:
+        self.inner.init_schema()
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator["CachedStorage"]:
+        touched: Set[int] = set()
+        try:
+            with self.inner.unit_of_work() as uow:
+                yield CachedStorage(uow, self.cache, touched)
+        finally:
+            for book_id in touched:
+                self.cache.invalidate(book_id)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Счётчики кеша (hits/misses/evictions/...) для подбора размера."""
+        return self.cache.stats()
+
+    def _invalidate(self, book_ids) -> None:
+        for book_id in book_ids:
+            self.cache.invalidate(book_id)
+            if self._touched is not None:
+                self._touched.add(book_id)
+
+    def get_book_by_id(self, book_id: int) -> Optional[InMemoryBook]:
+        if self._touched and book_id in self._touched:
+            return self.inner.get_book_by_id(book_id)
+        book = self.cache.get(book_id)
+        if book is None:
+            version = self.cache.version(book_id)
+            book = self.inner.get_book_by_id(book_id)
+            if book is not None:
+                self.cache.put(book_id, book, version)
+        return book
+
+    def generation(self) -> int:
+        return self.inner.generation()
+
+    def get_all_books(self) -> List[InMemoryBook]:
+        return self.inner.get_all_books()
+
+    def iter_books(self, batch_size: int = 500) -> Iterator[InMemoryBook]:
+        return self.inner.iter_books(batch_size)
+
+    def get_books_page(self, after_id: int, limit: int) -> List[InMemoryBook]:
+        return self.inner.get_books_page(after_id, limit)
+
+    def create_book(
+        self, title: str, author: str, description: Optional[str] = None
+    ) -> InMemoryBook:
+        return self.inner.create_book(title, author, description)
+
+    def bulk_create_books(self, items: List[Dict]) -> List[InMemoryBook]:
+        return self.inner.bulk_create_books(items)
+
+    def update_book(self, book_id: int, **kwargs) -> Optional[InMemoryBook]:
+        book = self.inner.update_book(book_id, **kwargs)
+        self._invalidate([book_id])
+        return book
+
+    def update_statuses(
+        self, changes: List[Tuple[int, str]], validate: StatusValidator
+    ) -> List[Optional[str]]:
+        outcomes = self.inner.update_statuses(changes, validate)
+        self._invalidate(
+            book_id
+            for (book_id, _), outcome in zip(changes, outcomes)
+            if outcome is None
+        )
+        return outcomes
+
+    def delete_book(self, book_id: int) -> bool:
+        deleted = self.inner.delete_book(book_id)
+        self._invalidate([book_id])
+        return deleted
+
+    def search_books(self, query: str) -> List[InMemoryBook]:
+        return self.inner.search_books(query)
@@ -1,18 +1,72 @@
 import os
-from typing import Generator
+import re
+from typing import Dict, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
+from app.storage.query_log import query_log
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./readinglist.db")
 
+# Профиль SQLite, применяемый к каждому соединению пула.
+# WAL позволяет читать параллельно с записью, synchronous=NORMAL в WAL-режиме
+# безопасен при сбое приложения и убирает fsync на каждый коммит, а
+# busy_timeout заставляет ждать блокировку вместо "database is locked".
+SQLITE_PRAGMAS: Dict[str, str] = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Отрицательное значение — размер в КиБ (64 МиБ)
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+}
+
+
+def _pool_options() -> Dict[str, int]:
+    """Размер пула из окружения (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT)."""
+    options = {}
+    for env_name, option in (
+        ("DB_POOL_SIZE", "pool_size"),
+        ("DB_MAX_OVERFLOW", "max_overflow"),
+        ("DB_POOL_TIMEOUT", "pool_timeout"),
+    ):
+        value = os.getenv(env_name)
+        if value:
+            options[option] = int(value)
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None) -> None:
+    """Применить SQLITE_PRAGMAS к новому DBAPI-соединению."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            if not value:
+                continue
+            # PRAGMA не поддерживает параметры — значения из окружения проверяем
+            if not re.fullmatch(r"-?\w+", value):
+                raise ValueError(f"Invalid value for SQLite PRAGMA {name}")
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
 engine = create_engine(
     DATABASE_URL,
     connect_args=(
         {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
     ),
+    **_pool_options(),
 )
 
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+
+# Время запросов, slow-query log и предупреждения о N+1 (app.storage.query_log)
+query_log.instrument(engine)
+
 SessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=engine, class_=Session
 )
@@ -28,4 +82,12 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-__all__ = ["engine", "SessionLocal", "Base", "DATABASE_URL", "get_db"]
+__all__ = [
+    "engine",
+    "SessionLocal",
+    "Base",
+    "DATABASE_URL",
+    "SQLITE_PRAGMAS",
+    "apply_sqlite_pragmas",
+    "get_db",
+]
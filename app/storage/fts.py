@@ -0,0 +1,91 @@
+"""Полнотекстовый индекс SQLite FTS5 для поиска книг.
+
+Виртуальная таблица ``books_fts`` использует внешний контент (таблица
+``books``) и триграммный токенизатор, поэтому ``MATCH`` по ней даёт те же
+совпадения подстрок без учёта регистра, что и ``ILIKE '%q%'``, но без
+полного сканирования таблицы. Синхронизация с ``books`` — через триггеры.
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+
+FTS_TABLE = "books_fts"
+
+# Триграммный токенизатор появился в SQLite 3.34.0
+_MIN_SQLITE_VERSION = (3, 34, 0)
+
+# Запросы короче триграммы FTS5 не находит — для них остаётся LIKE
+MIN_QUERY_LENGTH = 3
+
+_CREATE_STATEMENTS = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, author, content='books', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON books BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, author)
+        VALUES (new.id, new.title, new.author);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, author ON books
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+        INSERT INTO {FTS_TABLE}(rowid, title, author)
+        VALUES (new.id, new.title, new.author);
+    END
+    """,
+)
+
+
+def fts5_available(conn: Connection) -> bool:
+    """Проверить, что это SQLite с FTS5 и триграммным токенизатором."""
+    if conn.dialect.name != "sqlite":
+        return False
+    version = conn.exec_driver_sql("SELECT sqlite_version()").scalar()
+    if tuple(int(part) for part in version.split(".")[:3]) < _MIN_SQLITE_VERSION:
+        return False
+    return bool(
+        conn.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar()
+    )
+
+
+def create_fts(conn: Connection) -> bool:
+    """Создать индекс и триггеры (идемпотентно). Возвращает True, если FTS включён."""
+    if not fts5_available(conn):
+        return False
+    exists = inspect(conn).has_table(FTS_TABLE)
+    for statement in _CREATE_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    if not exists:
+        # Индекс создаётся поверх уже заполненной таблицы — наполняем его
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def drop_fts(conn: Connection) -> None:
+    """Удалить индекс (триггеры удаляются вместе с таблицей books)."""
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def ensure_fts(engine: Engine) -> bool:
+    """Подключить FTS к существующей базе, если таблица books уже создана."""
+    with engine.begin() as conn:
+        if not inspect(conn).has_table("books"):
+            return False
+        return create_fts(conn)
+
+
+def match_expression(query: str) -> str:
+    """Экранировать пользовательский запрос как одну FTS5-фразу."""
+    return '"' + query.replace('"', '""') + '"'
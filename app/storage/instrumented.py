@@ -0,0 +1,93 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from app.metrics import STORAGE_OPERATION_DURATION
+from app.storage.base import BookStorage, InMemoryBook, StatusValidator
+
+T = TypeVar("T")
+
+
+class InstrumentedStorage(BookStorage):
+    """Замер длительности операций хранилища (storage_operation_duration_seconds).
+
+    Оборачивает любое хранилище, в том числе единицы работы, которые оно выдаёт.
+    """
+
+    def __init__(self, inner: BookStorage):
+        self.inner = inner
+
+    @property
+    def backend(self) -> str:
+        return self.inner.backend
+
+    def _timed(self, operation: str, call: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            STORAGE_OPERATION_DURATION.observe(
+                self.inner.backend, operation, value=time.perf_counter() - started
+            )
+
+    def init_schema(self) -> None:
+        self.inner.init_schema()
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator["InstrumentedStorage"]:
+        with self.inner.unit_of_work() as uow:
+            yield InstrumentedStorage(uow)
+
+    def generation(self) -> int:
+        return self._timed("generation", self.inner.generation)
+
+    def get_all_books(self) -> List[InMemoryBook]:
+        return self._timed("get_all_books", self.inner.get_all_books)
+
+    def iter_books(self, batch_size: int = 500) -> Iterator[InMemoryBook]:
+        # Учитываем весь обход, а не только создание генератора
+        started = time.perf_counter()
+        try:
+            yield from self.inner.iter_books(batch_size)
+        finally:
+            STORAGE_OPERATION_DURATION.observe(
+                self.inner.backend, "iter_books", value=time.perf_counter() - started
+            )
+
+    def get_books_page(self, after_id: int, limit: int) -> List[InMemoryBook]:
+        return self._timed(
+            "get_books_page", lambda: self.inner.get_books_page(after_id, limit)
+        )
+
+    def get_book_by_id(self, book_id: int) -> Optional[InMemoryBook]:
+        return self._timed("get_book_by_id", lambda: self.inner.get_book_by_id(book_id))
+
+    def create_book(
+        self, title: str, author: str, description: Optional[str] = None
+    ) -> InMemoryBook:
+        return self._timed(
+            "create_book", lambda: self.inner.create_book(title, author, description)
+        )
+
+    def bulk_create_books(self, items: List[Dict]) -> List[InMemoryBook]:
+        return self._timed(
+            "bulk_create_books", lambda: self.inner.bulk_create_books(items)
+        )
+
+    def update_book(self, book_id: int, **kwargs) -> Optional[InMemoryBook]:
+        return self._timed(
+            "update_book", lambda: self.inner.update_book(book_id, **kwargs)
+        )
+
+    def update_statuses(
+        self, changes: List[Tuple[int, str]], validate: StatusValidator
+    ) -> List[Optional[str]]:
+        return self._timed(
+            "update_statuses", lambda: self.inner.update_statuses(changes, validate)
+        )
+
+    def delete_book(self, book_id: int) -> bool:
+        return self._timed("delete_book", lambda: self.inner.delete_book(book_id))
+
+    def search_books(self, query: str) -> List[InMemoryBook]:
+        return self._timed("search_books", lambda: self.inner.search_books(query))
@@ -0,0 +1,150 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.storage.base import (
+    INTERNED_FIELDS,
+    BookStorage,
+    InMemoryBook,
+    StatusValidator,
+    apply_status_changes,
+    intern_value,
+)
+from app.storage.pagination import SortedIds
+from app.storage.search_index import TrigramIndex
+
+
+class MemoryStorage(BookStorage):
+    """In-memory хранилище книг."""
+
+    backend = "memory"
+
+    def __init__(self):
+        # id -> книга; dict сохраняет порядок вставки, поэтому он же
+        # служит упорядоченным списком для get_all_books (O(1) lookup/delete)
+        self.books: Dict[int, InMemoryBook] = {}
+        self.search_index = TrigramIndex()
+        self.sorted_ids = SortedIds()
+        # Запросы обрабатываются в пуле потоков — изменения делаем под блокировкой
+        self.lock = threading.Lock()
+        self.current_id = 1
+        self._generation = time.time_ns()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get_all_books(self) -> List[InMemoryBook]:
+        return list(self.books.values())
+
+    def iter_books(self, batch_size: int = 500) -> Iterator[InMemoryBook]:
+        # Keyset-пачки: ни результат, ни копия хранилища целиком не создаются
+        after_id = 0
+        while True:
+            ids = self.sorted_ids.page_after(after_id, batch_size)
+            if not ids:
+                return
+            for book_id in ids:
+                book = self.books.get(book_id)
+                if book is not None:
+                    yield book
+            after_id = ids[-1]
+
+    def get_books_page(self, after_id: int, limit: int) -> List[InMemoryBook]:
+        # Под блокировкой: иначе параллельный delete_book может убрать книгу
+        # между чтением id и словаря (KeyError)
+        with self.lock:
+            ids = self.sorted_ids.page_after(after_id, limit)
+            return [self.books[i] for i in ids]
+
+    def get_book_by_id(self, book_id: int) -> Optional[InMemoryBook]:
+        return self.books.get(book_id)
+
+    def create_book(
+        self, title: str, author: str, description: Optional[str] = None
+    ) -> InMemoryBook:
+        with self.lock:
+            self._generation += 1
+            return self._add(title, author, description)
+
+    def _add(self, title: str, author: str, description: Optional[str]) -> InMemoryBook:
+        book = InMemoryBook(
+            id=self.current_id, title=title, author=author, description=description
+        )
+        self.books[book.id] = book
+        self.search_index.add(book.id, (book.title, book.author))
+        self.sorted_ids.add(book.id)
+        self.current_id += 1
+        return book
+
+    def bulk_create_books(self, items: List[Dict]) -> List[InMemoryBook]:
+        with self.lock:
+            self._generation += 1
+            return [
+                self._add(item["title"], item["author"], item.get("description"))
+                for item in items
+            ]
+
+    def update_book(self, book_id: int, **kwargs) -> Optional[InMemoryBook]:
+        with self.lock:
+            book = self.books.get(book_id)
+            if not book:
+                return None
+
+            # Триграммы прежних значений индекс не хранит — запоминаем поля
+            old_fields = (book.title, book.author)
+            for key, value in kwargs.items():
+                if value is not None and hasattr(book, key):
+                    if key in INTERNED_FIELDS:
+                        value = intern_value(value)
+                    setattr(book, key, value)
+
+            book.updated_at = datetime.now()
+            self.search_index.update(book.id, old_fields, (book.title, book.author))
+            self._generation += 1
+            return book
+
+    def update_statuses(
+        self, changes: List[Tuple[int, str]], validate: StatusValidator
+    ) -> List[Optional[str]]:
+        with self.lock:
+            current = {
+                book_id: self.books[book_id].status
+                for book_id, _ in changes
+                if book_id in self.books
+            }
+            outcomes = apply_status_changes(current, changes, validate)
+            now = datetime.now()
+            for (book_id, _), outcome in zip(changes, outcomes):
+                if outcome is None:
+                    book = self.books[book_id]
+                    book.status = intern_value(current[book_id])
+                    book.updated_at = now
+            if None in outcomes:
+                self._generation += 1
+            return outcomes
+
+    def delete_book(self, book_id: int) -> bool:
+        with self.lock:
+            book = self.books.pop(book_id, None)
+            if book is None:
+                return False
+            self.search_index.remove(book_id, (book.title, book.author))
+            self.sorted_ids.discard(book_id)
+            self._generation += 1
+            return True
+
+    def search_books(self, query: str) -> List[InMemoryBook]:
+        query_lower = query.lower()
+        with self.lock:
+            candidate_ids = self.search_index.candidates(query)
+            if candidate_ids is None:
+                candidates = list(self.books.values())
+            else:
+                # id растут монотонно, так что сортировка сохраняет порядок создания
+                candidates = [self.books[book_id] for book_id in sorted(candidate_ids)]
+        return [
+            book
+            for book in candidates
+            if query_lower in book.title.lower() or query_lower in book.author.lower()
+        ]
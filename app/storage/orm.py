@@ -1,10 +1,11 @@
 from datetime import datetime
 from typing import Dict
 
-from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy import DateTime, Integer, String, Text, event
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.storage.db import Base
+from app.storage.fts import create_fts, drop_fts
 
 from ..models.book import BookStatus
 
@@ -35,3 +36,10 @@ class BookORM(Base):
             "created_at": self.created_at,
             "updated_at": self.updated_at,
         }
+
+
+# FTS5-индекс для поиска создаётся и удаляется вместе с таблицей books
+event.listen(
+    BookORM.__table__, "after_create", lambda target, conn, **kw: create_fts(conn)
+)
+event.listen(BookORM.__table__, "after_drop", lambda target, conn, **kw: drop_fts(conn))
@@ -0,0 +1,58 @@
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+from typing import List
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Больше id не бывает: INTEGER в SQLite (и BIGINT) — 64-битное знаковое
+MAX_CURSOR_ID = 2**63 - 1
+
+
+def encode_cursor(last_id: int) -> str:
+    """Непрозрачный курсор: последний отданный id (он же ключ сортировки)."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Разобрать курсор. При любой порче — ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_id = json.loads(raw)["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if (
+        not isinstance(last_id, int)
+        or isinstance(last_id, bool)
+        or not 0 <= last_id <= MAX_CURSOR_ID
+    ):
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+class SortedIds:
+    """Отсортированный список id для keyset-пагинации in-memory хранилища.
+
+    id выдаются монотонно, поэтому добавление — это append; страница
+    находится через bisect, и её стоимость не зависит от глубины.
+    """
+
+    def __init__(self):
+        self._ids: List[int] = []
+
+    def add(self, book_id: int) -> None:
+        if not self._ids or book_id > self._ids[-1]:
+            self._ids.append(book_id)
+        else:
+            self._ids.insert(bisect_left(self._ids, book_id), book_id)
+
+    def discard(self, book_id: int) -> None:
+        pos = bisect_left(self._ids, book_id)
+        if pos < len(self._ids) and self._ids[pos] == book_id:
+            del self._ids[pos]
+
+    def page_after(self, after_id: int, limit: int) -> List[int]:
+        start = bisect_right(self._ids, after_id)
+        return self._ids[start : start + limit]
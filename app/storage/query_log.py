@@ -0,0 +1,166 @@
+"""Замер SQL-запросов: время и число строк, slow-query log и поиск N+1.
+
+Хуки ``before/after_cursor_execute`` вешаются на движок SQLAlchemy. Запросы,
+выполненные во время HTTP-запроса, привязываются к его correlation_id через
+contextvar: ``track_queries`` открывает учёт в middleware, а синхронные
+эндпоинты и зависимости видят его и в пуле потоков (контекст копируется).
+"""
+
+import logging
+import os
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional
+
+from app.metrics import (
+    SQL_N_PLUS_ONE,
+    SQL_QUERIES_PER_REQUEST,
+    SQL_QUERY_DURATION,
+    SQL_SLOW_QUERIES,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+# Порог медленного запроса, мс
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+# Сколько раз один и тот же запрос может выполниться за HTTP-запрос до
+# предупреждения о N+1 (0 — проверка выключена)
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+# Сколько последних медленных запросов держать в памяти
+SQL_SLOW_QUERY_HISTORY = int(os.getenv("SQL_SLOW_QUERY_HISTORY", "100"))
+
+# Длинные IN (...) и пакетные INSERT в логе обрезаем
+_MAX_STATEMENT_LENGTH = 1000
+_STATEMENT_KINDS = ("select", "insert", "update", "delete")
+
+logger = logging.getLogger("app.sql")
+
+
+class RequestQueries:
+    """SQL-запросы одного HTTP-запроса."""
+
+    def __init__(self, correlation_id: Optional[str]):
+        self.correlation_id = correlation_id
+        self.count = 0
+        self.duration = 0.0
+        self.rows = 0
+        self.statements: "Counter[str]" = Counter()
+        # Запросы, повторившиеся чаще порога N+1
+        self.repeated: List[str] = []
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar(
+    "sql_request_queries", default=None
+)
+
+
+@contextmanager
+def track_queries(correlation_id: Optional[str]) -> Iterator[RequestQueries]:
+    """Учитывать SQL-запросы текущего контекста за этим correlation_id."""
+    queries = RequestQueries(correlation_id)
+    token = _current.set(queries)
+    try:
+        yield queries
+    finally:
+        _current.reset(token)
+        if queries.count:
+            SQL_QUERIES_PER_REQUEST.observe(value=queries.count)
+
+
+def current_queries() -> Optional[RequestQueries]:
+    return _current.get()
+
+
+def _statement_kind(statement: str) -> str:
+    head = statement.lstrip()[:6].lower()
+    return head if head in _STATEMENT_KINDS else "other"
+
+
+class QueryLog:
+    """Хуки движка: метрики, slow-query log и предупреждения о N+1.
+
+    Медленные запросы пишутся в логгер ``app.sql`` и в кольцевой буфер
+    ``slow_queries`` (последние ``history`` записей).
+    """
+
+    def __init__(
+        self,
+        slow_threshold_ms: float = 100,
+        n_plus_one_threshold: int = 10,
+        history: int = 100,
+    ):
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=history)
+
+    @classmethod
+    def from_env(cls) -> "QueryLog":
+        return cls(SQL_SLOW_QUERY_MS, SQL_N_PLUS_ONE_THRESHOLD, SQL_SLOW_QUERY_HISTORY)
+
+    def instrument(self, engine: "Engine") -> None:
+        from sqlalchemy import event
+
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        context._query_started = time.perf_counter()
+
+    def _after_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        kind = _statement_kind(statement)
+        SQL_QUERY_DURATION.observe(kind, value=duration)
+        # Для SELECT sqlite3 (как и многие драйверы) отдаёт -1: строки ещё
+        # не выбраны
+        rows = cursor.rowcount if cursor.rowcount >= 0 else None
+
+        queries = _current.get()
+        correlation_id = queries.correlation_id if queries else None
+        if queries is not None:
+            queries.count += 1
+            queries.duration += duration
+            queries.rows += rows or 0
+            if not executemany:
+                self._check_repeated(queries, statement)
+
+        if duration >= self.slow_threshold:
+            SQL_SLOW_QUERIES.inc(kind)
+            entry = {
+                "correlation_id": correlation_id,
+                "duration_ms": round(duration * 1000, 3),
+                "rows": rows,
+                "executemany": executemany,
+                "statement": statement[:_MAX_STATEMENT_LENGTH],
+            }
+            self.slow_queries.append(entry)
+            logger.warning("slow query %s", entry)
+
+    def _check_repeated(self, queries: RequestQueries, statement: str) -> None:
+        # Параметры привязываются отдельно, так что одинаковый текст — один и
+        # тот же запрос с разными id: типичный N+1 в цикле
+        if self.n_plus_one_threshold <= 0:
+            return
+        queries.statements[statement] += 1
+        if queries.statements[statement] == self.n_plus_one_threshold + 1:
+            queries.repeated.append(statement)
+            SQL_N_PLUS_ONE.inc()
+            logger.warning(
+                "possible N+1: statement repeated more than %d times "
+                "(correlation_id=%s): %s",
+                self.n_plus_one_threshold,
+                queries.correlation_id,
+                statement[:_MAX_STATEMENT_LENGTH],
+            )
+
+
+query_log = QueryLog.from_env()
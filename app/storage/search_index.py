@@ -0,0 +1,83 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+NGRAM_SIZE = 3
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def _field_grams(fields: Iterable[Optional[str]]) -> Set[str]:
+    grams: Set[str] = set()
+    for field in fields:
+        if field:
+            grams |= _ngrams(field.lower())
+    return grams
+
+
+class TrigramIndex:
+    """Инкрементальный триграммный инвертированный индекс для поиска подстрок.
+
+    Индекс только сужает множество кандидатов: вызывающий код обязан
+    проверить каждого кандидата обычным ``query in field.lower()``.
+    Триграммы документа не хранятся (это в разы больше самой книги): при
+    изменении и удалении вызывающий код передаёт прежние значения полей.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def add(self, doc_id: int, fields: Iterable[Optional[str]]) -> None:
+        """Проиндексировать новый документ."""
+        for gram in _field_grams(fields):
+            self._postings[gram].add(doc_id)
+
+    def remove(self, doc_id: int, fields: Iterable[Optional[str]]) -> None:
+        """Убрать документ с полями ``fields`` из индекса."""
+        self._discard(doc_id, _field_grams(fields))
+
+    def update(
+        self,
+        doc_id: int,
+        old_fields: Iterable[Optional[str]],
+        new_fields: Iterable[Optional[str]],
+    ) -> None:
+        """Переиндексировать документ: трогаются только изменившиеся триграммы."""
+        old = _field_grams(old_fields)
+        new = _field_grams(new_fields)
+        self._discard(doc_id, old - new)
+        for gram in new - old:
+            self._postings[gram].add(doc_id)
+
+    def _discard(self, doc_id: int, grams: Set[str]) -> None:
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(doc_id)
+            if not posting:
+                del self._postings[gram]
+
+    def candidates(self, query: str) -> Optional[Set[int]]:
+        """Вернуть id документов, которые могут содержать ``query``.
+
+        Для запросов короче триграммы индекс ничего не знает и возвращает
+        ``None`` — в этом случае нужен полный просмотр.
+        """
+        grams = _ngrams(query.lower())
+        if not grams:
+            return None
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
@@ -0,0 +1,335 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Select, case, insert, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.storage.base import (
+    BookStorage,
+    InMemoryBook,
+    StatusValidator,
+    apply_status_changes,
+)
+from app.storage.fts import FTS_TABLE, MIN_QUERY_LENGTH, ensure_fts, match_expression
+from app.storage.orm import BookORM
+
+# Как часто поколение обновляется само, если записи других процессов не видны
+# (не SQLite): дольше этого ETag и кеш поиска не устаревают
+DEFAULT_GENERATION_MAX_AGE = 5.0
+
+# Поля, которые можно менять через update_book
+_UPDATABLE_COLUMNS = ("title", "author", "description", "status")
+
+# Работаем с таблицей напрямую (Core): без identity map единица работы не
+# отдаёт устаревшие объекты после UPDATE, и не тратится время на гидратацию ORM
+books = BookORM.__table__
+
+
+def _row_to_book(row) -> InMemoryBook:
+    return InMemoryBook(**row._mapping)
+
+
+def _like_pattern(query: str) -> str:
+    """Шаблон LIKE для поиска подстроки: % и _ в запросе ищутся буквально."""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _is_file_sqlite(engine: Engine) -> bool:
+    url = engine.url
+    return (
+        engine.dialect.name == "sqlite"
+        and url.database not in (None, "", ":memory:")
+        and url.query.get("mode") != "memory"
+    )
+
+
+def _statuses_for_update(ids) -> Select:
+    """Текущие статусы книг с блокировкой строк до конца транзакции.
+
+    Без FOR UPDATE два параллельных пакета проверяют переходы по одним и тем же
+    устаревшим статусам и могут вместе применить запрещённый переход.
+    Строки блокируются по возрастанию id, чтобы пакеты не ловили взаимоблокировку.
+    SQLite FOR UPDATE не поддерживает, но и так сериализует пишущие транзакции.
+    """
+    return (
+        select(books.c.id, books.c.status)
+        .where(books.c.id.in_(ids))
+        .order_by(books.c.id)
+        .with_for_update()
+    )
+
+
+class SQLStorage(BookStorage):
+    """Хранилище книг в SQL-базе через SQLAlchemy.
+
+    Вне единицы работы каждый метод открывает свою сессию и коммитит её.
+    Внутри ``unit_of_work()`` все вызовы идут через одну сессию (одно
+    соединение из пула и одну транзакцию), коммит — при выходе.
+    """
+
+    backend = "sql"
+
+    def __init__(
+        self,
+        engine: Engine,
+        session_factory: sessionmaker,
+        session: Optional[Session] = None,
+        root: Optional["SQLStorage"] = None,
+        generation_max_age: Optional[float] = None,
+    ):
+        self.engine = engine
+        self.session_factory = session_factory
+        self._session = session
+        # Состояние FTS и поколение общие для хранилища и всех его единиц работы
+        self._root = root or self
+        if root is None:
+            # None — ещё не проверяли, доступен ли FTS5 в этой базе
+            self._fts_enabled: Optional[bool] = None
+            # Файл SQLite: записи других процессов видны по PRAGMA data_version,
+            # в памяти — других процессов нет
+            self._watch_data_version = _is_file_sqlite(engine)
+            if generation_max_age is None:
+                generation_max_age = (
+                    0 if engine.dialect.name == "sqlite" else DEFAULT_GENERATION_MAX_AGE
+                )
+            self.generation_max_age = generation_max_age
+            self._generation = time.time_ns()
+            self._generation_expires = time.monotonic() + generation_max_age
+            self._generation_lock = threading.Lock()
+            self._version_conn: Optional[sqlite3.Connection] = None
+            self._version_pid: Optional[int] = None
+            self._data_version: Optional[int] = None
+
+    @property
+    def fts_enabled(self) -> Optional[bool]:
+        return self._root._fts_enabled
+
+    @fts_enabled.setter
+    def fts_enabled(self, value: Optional[bool]) -> None:
+        self._root._fts_enabled = value
+
+    def init_schema(self) -> None:
+        BookORM.metadata.create_all(bind=self.engine)
+        self.fts_enabled = ensure_fts(self.engine)
+
+    def generation(self) -> int:
+        """Поколение в памяти процесса: условный GET не читает таблицы.
+
+        Растёт после коммита каждой записи этого процесса. Записи других
+        воркеров в файл SQLite видны по ``PRAGMA data_version`` (счётчик
+        страницы заголовка, без чтения таблиц и без блокировки записи) на
+        отдельном соединении. Для прочих СУБД такого сигнала нет: поколение
+        растёт само не реже чем раз в ``generation_max_age`` секунд, что
+        ограничивает устаревание ETag и кеша поиска при нескольких воркерах.
+        """
+        root = self._root
+        if root._watch_data_version:
+            root._check_data_version()
+        if root.generation_max_age > 0 and time.monotonic() >= root._generation_expires:
+            root._advance_generation()
+        return root._generation
+
+    def _check_data_version(self) -> None:
+        with self._generation_lock:
+            # Соединение не переживает fork: у каждого процесса своё
+            if self._version_conn is None or self._version_pid != os.getpid():
+                args, options = self.engine.dialect.create_connect_args(self.engine.url)
+                options["check_same_thread"] = False
+                self._version_conn = sqlite3.connect(*args, **options)
+                self._version_pid = os.getpid()
+                self._data_version = None
+            (version,) = self._version_conn.execute("PRAGMA data_version").fetchone()
+            # data_version меняется, когда базу изменило другое соединение
+            if self._data_version is not None and version != self._data_version:
+                self._generation += 1
+            self._data_version = version
+
+    def _advance_generation(self) -> None:
+        root = self._root
+        with root._generation_lock:
+            root._generation += 1
+            root._generation_expires = time.monotonic() + root.generation_max_age
+
+    @staticmethod
+    def _mark_changed(session: Session) -> None:
+        # Поколение двигаем после коммита: до него читатели видят старые данные
+        session.info["books_changed"] = True
+
+    def _after_commit(self, session: Session) -> None:
+        if session.info.pop("books_changed", False):
+            self._advance_generation()
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator["SQLStorage"]:
+        if self._session is not None:
+            yield self
+            return
+        with self.session_factory() as session:
+            with session.begin():
+                yield SQLStorage(self.engine, self.session_factory, session, self._root)
+            self._after_commit(session)
+
+    @contextmanager
+    def _session_scope(self) -> Iterator[Session]:
+        if self._session is not None:
+            yield self._session
+            return
+        with self.session_factory() as session:
+            with session.begin():
+                yield session
+            self._after_commit(session)
+
+    def get_all_books(self) -> List[InMemoryBook]:
+        with self._session_scope() as session:
+            rows = session.execute(select(books).order_by(books.c.id))
+            return [_row_to_book(row) for row in rows]
+
+    def iter_books(self, batch_size: int = 500) -> Iterator[InMemoryBook]:
+        # Поток может пережить запрос, поэтому у него всегда своя сессия;
+        # серверный курсор с yield_per — строки не материализуются все сразу
+        with self.session_factory() as session:
+            rows = session.execute(
+                select(books)
+                .order_by(books.c.id)
+                .execution_options(stream_results=True, yield_per=batch_size)
+            )
+            for row in rows:
+                yield _row_to_book(row)
+
+    def get_books_page(self, after_id: int, limit: int) -> List[InMemoryBook]:
+        with self._session_scope() as session:
+            rows = session.execute(
+                select(books)
+                .where(books.c.id > after_id)
+                .order_by(books.c.id)
+                .limit(limit)
+            )
+            return [_row_to_book(row) for row in rows]
+
+    def get_book_by_id(self, book_id: int) -> Optional[InMemoryBook]:
+        with self._session_scope() as session:
+            row = session.execute(select(books).where(books.c.id == book_id)).first()
+            return _row_to_book(row) if row else None
+
+    def create_book(
+        self, title: str, author: str, description: Optional[str] = None
+    ) -> InMemoryBook:
+        (book,) = self.bulk_create_books(
+            [{"title": title, "author": author, "description": description}]
+        )
+        return book
+
+    def bulk_create_books(self, items: List[Dict]) -> List[InMemoryBook]:
+        if not items:
+            return []
+        rows = [
+            {
+                "title": item["title"],
+                "author": item["author"],
+                "description": item.get("description"),
+            }
+            for item in items
+        ]
+        dialect = self.engine.dialect
+        with self._session_scope() as session:
+            self._mark_changed(session)
+            if dialect.insert_executemany_returning_sort_by_parameter_order:
+                # Один executemany с RETURNING; порядок результата = порядок rows
+                stmt = insert(books).returning(*books.c, sort_by_parameter_order=True)
+                return [_row_to_book(row) for row in session.execute(stmt, rows)]
+
+            created = [BookORM(**row) for row in rows]
+            session.add_all(created)
+            session.flush()
+            return [InMemoryBook(**orm.to_domain()) for orm in created]
+
+    def update_book(self, book_id: int, **kwargs) -> Optional[InMemoryBook]:
+        values = {
+            key: value
+            for key, value in kwargs.items()
+            if value is not None and key in _UPDATABLE_COLUMNS
+        }
+        stmt = (
+            update(books)
+            .where(books.c.id == book_id)
+            .values(updated_at=datetime.utcnow(), **values)
+        )
+        with self._session_scope() as session:
+            if self.engine.dialect.update_returning:
+                # Одна инструкция UPDATE ... RETURNING вместо get + commit + refresh
+                row = session.execute(stmt.returning(*books.c)).first()
+                if row is None:
+                    return None
+                self._mark_changed(session)
+                return _row_to_book(row)
+
+            if session.execute(stmt).rowcount == 0:
+                return None
+            self._mark_changed(session)
+            row = session.execute(select(books).where(books.c.id == book_id)).first()
+            return _row_to_book(row)
+
+    def update_statuses(
+        self, changes: List[Tuple[int, str]], validate: StatusValidator
+    ) -> List[Optional[str]]:
+        with self._session_scope() as session:
+            ids = {book_id for book_id, _ in changes}
+            current = dict(session.execute(_statuses_for_update(ids)).all())
+            outcomes = apply_status_changes(current, changes, validate)
+            changed = {
+                book_id: current[book_id]
+                for (book_id, _), outcome in zip(changes, outcomes)
+                if outcome is None
+            }
+            if changed:
+                # Один UPDATE ... SET status = CASE id WHEN ... END на весь пакет
+                session.execute(
+                    update(books)
+                    .where(books.c.id.in_(changed))
+                    .values(
+                        status=case(changed, value=books.c.id),
+                        updated_at=datetime.utcnow(),
+                    )
+                )
+                self._mark_changed(session)
+            return outcomes
+
+    def delete_book(self, book_id: int) -> bool:
+        with self._session_scope() as session:
+            result = session.execute(books.delete().where(books.c.id == book_id))
+            if result.rowcount == 0:
+                return False
+            self._mark_changed(session)
+            return True
+
+    def search_books(self, query: str) -> List[InMemoryBook]:
+        if self.fts_enabled is None:
+            self.fts_enabled = ensure_fts(self.engine)
+        with self._session_scope() as session:
+            if self.fts_enabled and len(query) >= MIN_QUERY_LENGTH:
+                fts_ids = text(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"
+                ).bindparams(q=match_expression(query))
+                rows = session.execute(
+                    select(books).where(books.c.id.in_(fts_ids)).order_by(books.c.id)
+                )
+                return [_row_to_book(row) for row in rows]
+
+            # Fallback без FTS5 (или для коротких запросов): полное сканирование
+            search_pattern = _like_pattern(query)
+            rows = session.execute(
+                select(books)
+                .where(
+                    books.c.title.ilike(search_pattern, escape="\\")
+                    | books.c.author.ilike(search_pattern, escape="\\")
+                )
+                .order_by(books.c.id)
+            )
+            return [_row_to_book(row) for row in rows]
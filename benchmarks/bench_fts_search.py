@@ -0,0 +1,85 @@
+"""Бенчмарк поиска книг в SQL-бэкенде: FTS5 против ILIKE.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_fts_search.py [количество_строк]
+
+По умолчанию заполняет временную SQLite-базу 1 000 000 книг.
+"""
+
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+QUERIES = ["tolkien", "ring", "dune", "zzzz", "martin"]
+REPEATS = 5
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+
+
+def _populate(engine, table, rows: int) -> None:
+    rng = random.Random(42)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            title = " ".join(_word(rng) for _ in range(3))
+            author = " ".join(_word(rng) for _ in range(2))
+            if i % 1000 == 0:
+                title += " of the ring"
+                author += " tolkien"
+            batch.append({"title": title, "author": author})
+            if len(batch) == 10_000:
+                conn.execute(table.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+
+
+def _time_queries(db) -> float:
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        for query in QUERIES:
+            db.search_books(query)
+    return (time.perf_counter() - started) / (REPEATS * len(QUERIES))
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["USE_SQL_DB"] = "true"
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+
+        from app.storage import database, db, orm
+
+        orm.Base.metadata.create_all(bind=db.engine)
+        started = time.perf_counter()
+        _populate(db.engine, orm.BookORM.__table__, rows)
+        print(f"rows: {rows}, insert: {time.perf_counter() - started:.1f}s")
+
+        # Поиск не кешируется по id, но fts_enabled есть только у SQLStorage
+        store = database.db
+        while hasattr(store, "inner"):
+            store = store.inner
+        store.fts_enabled = True
+        fts = _time_queries(store)
+        store.fts_enabled = False
+        like = _time_queries(store)
+
+        print(f"ILIKE: {like * 1000:.2f} ms/query")
+        print(f"FTS5:  {fts * 1000:.2f} ms/query")
+        print(f"speedup: {like / fts:.1f}x")
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Бенчмарк памяти in-memory хранилища книг.
+
+Сравнивает прежние представления книги (dict на книгу в ``books.py`` и
+класс с ``__dict__``) с текущим ``InMemoryBook`` на ``__slots__`` с
+интернированными авторами и статусами. Затем заполняет ``MemoryStorage``
+книгами со случайными словами (как bench_storage) и меряет хранилище целиком
+с разбивкой: записи, триграммный индекс, ``SortedIds``. Доли индекса и id
+меряются по освобождённой памяти после их удаления.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_memory_footprint.py [количество_книг]
+"""
+
+import gc
+import random
+import string
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.storage.database import InMemoryBook  # noqa: E402
+from app.storage.memory import MemoryStorage  # noqa: E402
+
+AUTHORS = 5_000
+SEED_BATCH = 10_000
+
+
+class DictBook:
+    """Книга до перехода на __slots__ (с per-instance __dict__)."""
+
+    def __init__(self, id, title, author, description, status, created_at, updated_at):
+        self.id = id
+        self.title = title
+        self.author = author
+        self.description = description
+        self.status = status
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+def _fields(i: int):
+    now = datetime.now()
+    # Строки собираются заново, как при разборе JSON-запроса
+    author = "".join(["Author ", str(i % AUTHORS)])
+    status = "".join(["to_", "read"])
+    return i, f"Title {i}", author, None, status, now, now
+
+
+def _as_dict(i):
+    id_, title, author, description, status, created, updated = _fields(i)
+    return {
+        "id": id_,
+        "title": title,
+        "author": author,
+        "description": description,
+        "status": status,
+        "created_at": created,
+        "updated_at": updated,
+    }
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+
+
+def _print(name: str, size: int, count: int) -> None:
+    print(f"{name:<28} {size / 2**20:8.1f} MiB  {size / count:6.0f} B/book")
+
+
+def _measure_storage(count: int) -> None:
+    rng = random.Random(42)
+    gc.collect()
+    tracemalloc.start()
+    storage = MemoryStorage()
+    for start in range(0, count, SEED_BATCH):
+        storage.bulk_create_books(
+            [
+                {
+                    "title": " ".join(_word(rng) for _ in range(3)),
+                    "author": " ".join(_word(rng) for _ in range(2)),
+                }
+                for _ in range(min(SEED_BATCH, count - start))
+            ]
+        )
+    total, _ = tracemalloc.get_traced_memory()
+    storage.search_index = None
+    gc.collect()
+    without_index, _ = tracemalloc.get_traced_memory()
+    storage.sorted_ids = None
+    gc.collect()
+    records, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del storage
+    _print("MemoryStorage (seeded)", total, count)
+    _print("  records", records, count)
+    _print("  trigram index", total - without_index, count)
+    _print("  SortedIds", without_index - records, count)
+
+
+def _measure(name: str, factory, count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    store = {i: factory(i) for i in range(1, count + 1)}
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    _print(name, size, count)
+    return size
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"books: {count}")
+    as_dict = _measure("dict per book", _as_dict, count)
+    as_class = _measure("class with __dict__", lambda i: DictBook(*_fields(i)), count)
+    slotted = _measure(
+        "InMemoryBook (__slots__)", lambda i: InMemoryBook(*_fields(i)), count
+    )
+    print(
+        f"vs dict: {as_dict / slotted:.2f}x, vs __dict__ class: {as_class / slotted:.2f}x"
+    )
+    _measure_storage(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Бенчмарк накладных расходов стека middleware.
+
+Собирает приложение с роутером книг и всеми middleware (ошибки, rate limit с
+лимитами, которые не срабатывают, ограничение размера тела) и гоняет запросы
+в процессе через ASGI-транспорт httpx — сеть и сервер в замер не входят.
+Прогоняются три варианта: ``bare`` — без middleware, ``legacy`` — прежний
+стек на BaseHTTPMiddleware (``legacy_middleware.py``), ``asgi`` — текущий
+стек на чистом ASGI. Параметры лимитов у обоих стеков одинаковые.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_middleware.py [запросов] [параллельно]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.api.endpoints import books  # noqa: E402
+from app.middleware.error_handler import ErrorHandlerMiddleware  # noqa: E402
+from app.middleware.rate_limit import RateLimitMiddleware  # noqa: E402
+from app.middleware.request_size import RequestSizeLimitMiddleware  # noqa: E402
+from benchmarks.legacy_middleware import (  # noqa: E402
+    LegacyErrorHandlerMiddleware,
+    LegacyRateLimitMiddleware,
+    LegacyRequestSizeLimitMiddleware,
+)
+
+# Стек снаружи внутрь: ошибки, rate limit, размер тела
+STACKS = {
+    "bare": (),
+    "legacy": (
+        LegacyErrorHandlerMiddleware,
+        LegacyRateLimitMiddleware,
+        LegacyRequestSizeLimitMiddleware,
+    ),
+    "asgi": (
+        ErrorHandlerMiddleware,
+        RateLimitMiddleware,
+        RequestSizeLimitMiddleware,
+    ),
+}
+
+
+def _make_app(stack: str) -> FastAPI:
+    app = FastAPI()
+    app.include_router(books.router)
+    if STACKS[stack]:
+        error_handler, rate_limit, request_size = STACKS[stack]
+        app.add_middleware(request_size, max_body_size=1_000_000)
+        app.add_middleware(
+            rate_limit, post_limit=10**9, global_limit=10**9, window_seconds=1
+        )
+        app.add_middleware(error_handler)
+    return app
+
+
+async def _run(app: FastAPI, requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for i in range(50):
+            await client.post("/api/v1/books/", json={"title": f"B{i}", "author": "A"})
+
+        async def worker(count: int) -> None:
+            for i in range(count):
+                started = time.perf_counter()
+                if i % 5 == 0:
+                    await client.post(
+                        "/api/v1/books/", json={"title": "Bench", "author": "A"}
+                    )
+                else:
+                    await client.get("/api/v1/books/", params={"limit": 20})
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(worker(requests // concurrency) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return len(latencies) / elapsed, statistics.median(latencies), p99
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    for name in STACKS:
+        rps, p50, p99 = asyncio.run(_run(_make_app(name), requests, concurrency))
+        print(
+            f"{name:<7} {rps:8.0f} req/s  p50 {p50 * 1000:6.2f} ms  "
+            f"p99 {p99 * 1000:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
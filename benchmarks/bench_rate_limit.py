@@ -0,0 +1,105 @@
+"""Бенчмарк стоимости проверки rate limit в зависимости от числа событий в окне.
+
+Сравнивает прежний алгоритм (список событий на IP, фильтруемый на каждый
+запрос) со счётчиками скользящего окна ``RateLimitMiddleware`` в памяти
+процесса и в общем для воркеров SQLite-файле. Middleware вызывается напрямую
+с пустым приложением; лимиты заведомо не срабатывают.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_rate_limit.py [запросов_на_замер]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.middleware.rate_limit import RateLimitMiddleware  # noqa: E402
+from app.middleware.rate_limit_backends import (  # noqa: E402
+    MemoryRateLimitBackend,
+    SQLiteRateLimitBackend,
+)
+
+EVENTS_IN_WINDOW = (10, 100, 1_000, 10_000)
+
+
+class ListRateLimit:
+    """Прежняя реализация: O(событий в окне) на запрос."""
+
+    def __init__(self, app, window_seconds, post_limit, global_limit):
+        self.app = app
+        self.window = window_seconds
+        self.post_limit = post_limit
+        self.global_limit = global_limit
+        self.store = {}
+
+    async def __call__(self, scope, receive, send):
+        ip = scope["client"][0]
+        now = time.time()
+        events = [e for e in self.store.get(ip, []) if e["t"] > now - self.window]
+        post_events = [
+            e
+            for e in events
+            if e["method"] == "POST" and e["path"].startswith("/api/v1/books")
+        ]
+        if len(post_events) >= self.post_limit or len(events) >= self.global_limit:
+            return
+        events.append({"t": now, "method": scope["method"], "path": scope["path"]})
+        self.store[ip] = events
+        await self.app(scope, receive, send)
+
+
+async def _noop(scope, receive, send) -> None:
+    return None
+
+
+async def _measure(limiter, warmup: int, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/books/",
+        "client": ("10.0.0.1", 1234),
+    }
+    for _ in range(warmup):
+        await limiter(scope, None, None)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await limiter(scope, None, None)
+    return (time.perf_counter() - started) / requests
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    print(
+        f"{'events/window':>14} {'list, us/req':>14} {'memory, us/req':>15} "
+        f"{'sqlite, us/req':>15}"
+    )
+    limits = dict(post_limit=10**9, global_limit=10**9)
+    with tempfile.TemporaryDirectory() as tmp:
+        for events in EVENTS_IN_WINDOW:
+            old = ListRateLimit(_noop, window_seconds=3600, **limits)
+            memory = RateLimitMiddleware(
+                _noop, backend=MemoryRateLimitBackend(3600, 100_000), **limits
+            )
+            sqlite = RateLimitMiddleware(
+                _noop,
+                backend=SQLiteRateLimitBackend(f"{tmp}/{events}.db", 3600, 100_000),
+                **limits,
+            )
+            timings = [
+                asyncio.run(_measure(limiter, events, requests))
+                for limiter in (old, memory, sqlite)
+            ]
+            print(
+                f"{events:>14} {timings[0] * 1e6:14.2f} {timings[1] * 1e6:15.2f} "
+                f"{timings[2] * 1e6:15.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Бенчмарк сериализации списка книг: dict + JSONResponse против кеша фрагментов.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_serialization.py [число_книг] [повторов]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.api.serialization import BookJSONCache, book_to_dict  # noqa: E402
+from app.storage.base import InMemoryBook  # noqa: E402
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    books = [
+        InMemoryBook(id=i, title=f"Book {i}", author=f"Author {i % 100}")
+        for i in range(1, count + 1)
+    ]
+    cache = BookJSONCache(count)
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        JSONResponse(jsonable_encoder([book_to_dict(book) for book in books])).body
+    baseline = (time.perf_counter() - started) / repeats
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        b"[" + b",".join(map(cache.encode, books)) + b"]"
+    cached = (time.perf_counter() - started) / repeats
+
+    print(f"books: {count}")
+    print(f"dict + JSONResponse: {baseline * 1000:8.1f} ms/response")
+    print(f"cached fragments:    {cached * 1000:8.1f} ms/response")
+    print(f"speedup:             {baseline / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
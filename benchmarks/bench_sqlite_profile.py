@@ -0,0 +1,92 @@
+"""Бенчмарк пропускной способности SQLite до и после профиля соединений.
+
+Сравнивает движок без PRAGMA (rollback journal, synchronous=FULL) с
+движком, к соединениям которого применяется ``apply_sqlite_pragmas``
+(WAL, synchronous=NORMAL, кеш, mmap, busy_timeout).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_sqlite_profile.py [потоков] [операций_на_поток]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, event, insert, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.storage.db import apply_sqlite_pragmas  # noqa: E402
+from app.storage.orm import BookORM  # noqa: E402
+
+
+def _make_engine(path: str, profiled: bool):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=16,
+    )
+    if profiled:
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+    BookORM.metadata.create_all(bind=engine)
+    return engine
+
+
+def _writer(engine, ops: int) -> int:
+    errors = 0
+    for i in range(ops):
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(BookORM), {"title": f"Book {i}", "author": "A"})
+        except OperationalError:
+            errors += 1
+    return errors
+
+
+def _reader(engine, ops: int) -> int:
+    rng = random.Random()
+    errors = 0
+    for _ in range(ops):
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    select(BookORM.title).where(BookORM.id == rng.randint(1, 1000))
+                ).all()
+        except OperationalError:
+            errors += 1
+    return errors
+
+
+def _run(engine, threads: int, ops: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads * 2) as pool:
+        writers = [pool.submit(_writer, engine, ops) for _ in range(threads)]
+        readers = [pool.submit(_reader, engine, ops * 4) for _ in range(threads)]
+        errors = sum(f.result() for f in writers + readers)
+    elapsed = time.perf_counter() - started
+    return threads * ops * 5 / elapsed, threads * ops / elapsed, errors
+
+
+def main() -> None:
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, profiled in (("default", False), ("profiled", True)):
+            engine = _make_engine(f"{tmp}/{name}.db", profiled)
+            total, writes, errors = _run(engine, threads, ops)
+            print(
+                f"{name:<9} {total:8.0f} ops/s  {writes:7.0f} writes/s  "
+                f"locked errors: {errors}"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Бенчмарк операций хранилища книг на разных объёмах для обоих бэкендов.
+
+Заполняет in-memory и SQL-хранилище (временная SQLite с профилем
+``apply_sqlite_pragmas``) синтетическими книгами и замеряет создание, чтение
+по id, обновление, смену статуса, удаление, страницу списка и поиск
+(с совпадениями и без). Для каждой операции — пропускная способность и
+p50/p99 латентности (лучший из ``--rounds`` раундов по p50); результат
+печатается как JSON, чтобы сравнивать прогоны.
+
+С ``--baseline`` результат сравнивается с сохранённым JSON: если p50
+операции вырос больше чем на ``--threshold`` (и не меньше чем на
+``--min-delta-ms`` — субмикросекундные операции памяти слишком шумные),
+скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_storage.py [--sizes 10000,100000,1000000]
+        [--backends memory,sql] [--ops 1000] [--search-ops 20] [--rounds 3]
+        [--output result.json] [--baseline baseline.json] [--threshold 0.2]
+        [--min-delta-ms 0.005]
+"""
+
+import argparse
+import json
+import platform
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.api.endpoints.books import validate_status_transition  # noqa: E402
+from app.storage.base import BookStorage  # noqa: E402
+from app.storage.cache import CachedStorage, LRUCache  # noqa: E402
+from app.storage.db import apply_sqlite_pragmas  # noqa: E402
+from app.storage.memory import MemoryStorage  # noqa: E402
+from app.storage.pagination import DEFAULT_PAGE_SIZE  # noqa: E402
+from app.storage.sql import SQLStorage  # noqa: E402
+
+BACKENDS = ("memory", "sql", "cached_sql")
+SEED_BATCH = 10_000
+# Каждая тысячная книга содержит слово для поиска с совпадениями
+HIT_EVERY = 1000
+HIT_QUERY = "tolkien"
+MISS_QUERY = "qqzzxx"
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+
+
+def _book(rng: random.Random, i: int) -> Dict:
+    title = " ".join(_word(rng) for _ in range(3))
+    author = " ".join(_word(rng) for _ in range(2))
+    if i % HIT_EVERY == 0:
+        author += f" {HIT_QUERY}"
+    return {"title": title, "author": author, "description": None}
+
+
+def _make_storage(backend: str, tmp: str) -> BookStorage:
+    if backend == "memory":
+        return MemoryStorage()
+    engine = create_engine(
+        f"sqlite:///{tmp}/{backend}.db", connect_args={"check_same_thread": False}
+    )
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    storage: BookStorage = SQLStorage(
+        engine, sessionmaker(bind=engine, autoflush=False)
+    )
+    storage.init_schema()
+    if backend == "cached_sql":
+        storage = CachedStorage(storage, LRUCache(10_000, 60))
+    return storage
+
+
+def _seed(storage: BookStorage, size: int) -> List[int]:
+    rng = random.Random(42)
+    ids: List[int] = []
+    for start in range(0, size, SEED_BATCH):
+        batch = [_book(rng, i) for i in range(start, min(start + SEED_BATCH, size))]
+        ids.extend(book.id for book in storage.bulk_create_books(batch))
+    return ids
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, round(q * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def _measure(calls: List[Callable[[], object]]) -> Dict[str, float]:
+    latencies = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "throughput_ops_s": round(len(latencies) / total, 1) if total else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 4),
+    }
+
+
+def _run_operations(
+    storage: BookStorage, ids: List[int], ops: int, search_ops: int, seed: int
+) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(seed)
+    picked = rng.sample(ids, min(ops, len(ids)))
+    created: List[int] = []
+    max_after = max(ids) - DEFAULT_PAGE_SIZE
+
+    def create():
+        created.append(storage.create_book("Benchmark", "Bench Author").id)
+
+    # Порядок важен: смена статуса to_read -> in_progress (в следующих раундах
+    # часть книг уже in_progress -> in_progress); удаляются книги, созданные
+    # замером create, — объём не меняется
+    return {
+        "create": _measure([create] * ops),
+        "get_by_id": _measure(
+            [
+                lambda book_id=book_id: storage.get_book_by_id(book_id)
+                for book_id in picked
+            ]
+        ),
+        "update": _measure(
+            [
+                lambda book_id=book_id: storage.update_book(book_id, title="Updated")
+                for book_id in picked
+            ]
+        ),
+        "status_change": _measure(
+            [
+                lambda book_id=book_id: storage.update_statuses(
+                    [(book_id, "in_progress")], validate_status_transition
+                )
+                for book_id in picked
+            ]
+        ),
+        "delete": _measure(
+            [
+                lambda book_id=book_id: storage.delete_book(book_id)
+                for book_id in created
+            ]
+        ),
+        "list_page": _measure(
+            [
+                lambda after=rng.randint(0, max_after): storage.get_books_page(
+                    after, DEFAULT_PAGE_SIZE
+                )
+                for _ in range(ops)
+            ]
+        ),
+        "search_hit": _measure([lambda: storage.search_books(HIT_QUERY)] * search_ops),
+        "search_miss": _measure(
+            [lambda: storage.search_books(MISS_QUERY)] * search_ops
+        ),
+    }
+
+
+def _regressions(
+    result: Dict, baseline: Dict, threshold: float, min_delta_ms: float
+) -> List[str]:
+    """Операции, у которых p50 вырос больше чем на ``threshold`` от базового."""
+    failures = []
+    for backend, sizes in result["results"].items():
+        for size, operations in sizes.items():
+            base_operations = baseline["results"].get(backend, {}).get(size, {})
+            for operation, stats in operations.items():
+                base = base_operations.get(operation)
+                if base is None or not base["p50_ms"]:
+                    continue
+                ratio = stats["p50_ms"] / base["p50_ms"]
+                delta = stats["p50_ms"] - base["p50_ms"]
+                if ratio > 1 + threshold and delta >= min_delta_ms:
+                    failures.append(
+                        f"{backend}/{size}/{operation}: p50 {base['p50_ms']} ms -> "
+                        f"{stats['p50_ms']} ms (x{ratio:.2f})"
+                    )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--backends", default="memory,sql")
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--search-ops", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="Куда записать JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--min-delta-ms", type=float, default=0.005)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    backends = args.backends.split(",")
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+
+    result: Dict = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "ops": args.ops,
+        "search_ops": args.search_ops,
+        "rounds": args.rounds,
+        "results": {},
+    }
+    for backend in backends:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                storage = _make_storage(backend, tmp)
+                started = time.perf_counter()
+                ids = _seed(storage, size)
+                seeded = time.perf_counter() - started
+                print(
+                    f"{backend}: {size} books seeded in {seeded:.1f}s", file=sys.stderr
+                )
+                operations: Dict[str, Dict[str, float]] = {}
+                for seed in range(args.rounds):
+                    rounds = _run_operations(
+                        storage, ids, args.ops, args.search_ops, seed
+                    )
+                    # Лучший раунд по p50: меньше шума от соседей по машине
+                    for name, stats in rounds.items():
+                        best = operations.get(name)
+                        if best is None or stats["p50_ms"] < best["p50_ms"]:
+                            operations[name] = stats
+                result["results"].setdefault(backend, {})[str(size)] = operations
+                engine = getattr(getattr(storage, "inner", storage), "engine", None)
+                if engine is not None:
+                    engine.dispose()
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        failures = _regressions(result, baseline, args.threshold, args.min_delta_ms)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print(f"no regressions above {args.threshold:.0%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Прежний стек middleware на BaseHTTPMiddleware — «до» для bench_middleware.
+
+Горячий путь повторяет версии app/middleware до перевода на чистый ASGI
+(``git show 9af851f^:app/middleware/``): correlation_id и перехват
+исключений, rate limit со списком событий на клиента и фильтрацией окна на
+каждый запрос, чтение всего тела в ограничении размера. Ответы об ошибках
+упрощены — в бенчмарке они не возникают.
+"""
+
+import time
+import uuid
+from typing import Dict, List
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+def _problem(request: Request, status_code: int, title: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "title": title,
+            "status": status_code,
+            "instance": request.url.path,
+            "correlation_id": getattr(
+                request.state, "correlation_id", str(uuid.uuid4())
+            ),
+        },
+    )
+
+
+class LegacyErrorHandlerMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            request.state.correlation_id = str(uuid.uuid4())
+            return await call_next(request)
+        except Exception:
+            return _problem(request, 500, "Internal Server Error")
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(
+        self,
+        app,
+        *,
+        window_seconds: int = 60,
+        post_limit: int = 10,
+        global_limit: int = 1000,
+    ):
+        super().__init__(app)
+        self.window = window_seconds
+        self.post_limit = post_limit
+        self.global_limit = global_limit
+        self.store: Dict[str, List[Dict]] = {}
+
+    async def dispatch(self, request: Request, call_next):
+        ip = request.client.host if request.client else "unknown"
+        now = time.time()
+
+        events = self.store.get(ip, [])
+        events = [e for e in events if e["t"] > now - self.window]
+
+        post_events = [
+            e
+            for e in events
+            if e["method"] == "POST" and e["path"].startswith("/api/v1/books")
+        ]
+        if request.method == "POST" and request.url.path.startswith("/api/v1/books"):
+            if len(post_events) >= self.post_limit:
+                return _problem(request, 429, "Too Many Requests")
+        if len(events) >= self.global_limit:
+            return _problem(request, 429, "Too Many Requests")
+
+        events.append({"t": now, "method": request.method, "path": request.url.path})
+        self.store[ip] = events
+        return await call_next(request)
+
+
+class LegacyRequestSizeLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, *, max_body_size: int = 1_000_000):
+        super().__init__(app)
+        self.max_body_size = max_body_size
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method in ("POST", "PUT", "PATCH"):
+            body = await request.body()
+            if body and len(body) > self.max_body_size:
+                return _problem(request, 413, "Payload Too Large")
+
+            async def receive():
+                return {"type": "http.request", "body": body}
+
+            request._receive = receive
+
+        return await call_next(request)
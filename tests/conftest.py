@@ -5,3 +5,60 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]  # корень репозитория
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def sql_storage():
+    """SQL-хранилище поверх отдельной in-memory SQLite."""
+    pytest.importorskip("sqlalchemy")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.storage.orm import BookORM
+    from app.storage.sql import SQLStorage
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    BookORM.metadata.create_all(bind=engine)
+    yield SQLStorage(engine, sessionmaker(bind=engine, autoflush=False))
+    engine.dispose()
+
+
+@pytest.fixture
+def shared_sql_storages(tmp_path):
+    """Два SQL-хранилища с одним файлом SQLite — как два воркера uvicorn."""
+    pytest.importorskip("sqlalchemy")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.storage.sql import SQLStorage
+
+    url = f"sqlite:///{tmp_path / 'books.db'}"
+    storages = []
+    for _ in range(2):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        storages.append(SQLStorage(engine, sessionmaker(bind=engine)))
+    storages[0].init_schema()
+    yield storages
+    for storage in storages:
+        storage.engine.dispose()
+
+
+@pytest.fixture(params=["memory", "sql", "cached_sql"])
+def storage(request):
+    """Каждый бэкенд хранилища — для контрактных тестов."""
+    if request.param == "sql":
+        return request.getfixturevalue("sql_storage")
+    if request.param == "cached_sql":
+        from app.storage.cache import CachedStorage, LRUCache
+
+        return CachedStorage(request.getfixturevalue("sql_storage"), LRUCache(100, 60))
+    from app.storage.memory import MemoryStorage
+
+    return MemoryStorage()
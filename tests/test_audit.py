@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.audit import AuditSink
+
+
+class _StalledSink(AuditSink):
+    """Писатель ждёт сигнала — очередь заполняется."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+
+    def _write(self, batch):
+        self.release.wait()
+        super()._write(batch)
+
+
+class TestAuditSink:
+    """Тесты фонового аудит-журнала"""
+
+    def test_writes_json_lines_to_file(self, tmp_path):
+        path = tmp_path / "audit.log"
+        sink = AuditSink(str(path))
+
+        for i in range(5):
+            sink.submit({"event": "status_change", "book_id": i})
+        sink.close()
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [r["book_id"] for r in records] == [0, 1, 2, 3, 4]
+        assert sink.stats()["written"] == 5
+
+    def test_drop_policy_counts_dropped(self, tmp_path):
+        sink = _StalledSink(str(tmp_path / "audit.log"), queue_size=2, batch_size=1)
+
+        results = [sink.submit({"n": i}) for i in range(10)]
+        sink.release.set()
+        sink.close()
+
+        # Одна запись у писателя, две в очереди, остальные отброшены
+        assert results.count(True) <= 3
+        assert sink.stats()["dropped"] == results.count(False) >= 7
+
+    def test_block_policy_waits_for_space(self, tmp_path):
+        path = tmp_path / "audit.log"
+        sink = _StalledSink(str(path), queue_size=1, overflow="block")
+        sink.release.set()
+
+        for i in range(50):
+            assert sink.submit({"n": i})
+        sink.close()
+
+        assert len(path.read_text().splitlines()) == 50
+        assert sink.stats()["dropped"] == 0
+
+    def test_block_policy_drops_on_event_loop(self, tmp_path):
+        sink = _StalledSink(
+            str(tmp_path / "audit.log"), queue_size=1, batch_size=1, overflow="block"
+        )
+        results = []
+
+        async def handler():
+            results.extend(sink.submit({"n": i}) for i in range(10))
+
+        # Цикл в отдельном потоке: если submit заблокируется, тест не повиснет
+        loop_thread = threading.Thread(
+            target=asyncio.run, args=(handler(),), daemon=True
+        )
+        loop_thread.start()
+        loop_thread.join(timeout=5)
+        sink.release.set()
+        assert not loop_thread.is_alive()
+        sink.close()
+
+        assert results.count(False) >= 8
+        assert sink.stats()["dropped"] == results.count(False)
+
+    def test_rotation(self, tmp_path):
+        path = tmp_path / "audit.log"
+        sink = AuditSink(str(path), max_bytes=200, backup_count=2, batch_size=1)
+
+        for i in range(20):
+            sink.submit({"event": "error", "detail": "x" * 50, "n": i})
+        sink.close()
+
+        assert (tmp_path / "audit.log.1").exists()
+
+    def test_unknown_overflow_policy(self):
+        with pytest.raises(ValueError):
+            AuditSink(overflow="explode")
@@ -0,0 +1,111 @@
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.main import app
+
+client = TestClient(app)
+
+
+class TestBulkCreate:
+    """Тесты массового создания книг"""
+
+    def test_bulk_create_success(self):
+        """Все книги созданы, id идут в порядке входных данных"""
+        items = [{"title": f"Bulk {i}", "author": "Author"} for i in range(3)]
+        response = client.post("/api/v1/books/bulk", json=items)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["errors"] == []
+        assert len(data["ids"]) == 3
+        for item, book_id in zip(items, data["ids"]):
+            assert (
+                client.get(f"/api/v1/books/{book_id}").json()["title"] == item["title"]
+            )
+
+    def test_bulk_create_rejects_all_on_error(self):
+        """Без partial одна невалидная книга отменяет весь запрос"""
+        before = len(client.get("/api/v1/books").json())
+        items = [{"title": "Ok", "author": "A"}, {"title": "", "author": "A"}]
+        response = client.post("/api/v1/books/bulk", json=items)
+
+        assert response.status_code == 422
+        data = response.json()
+        assert "correlation_id" in data
+        assert [e["index"] for e in data["errors"]] == [1]
+        assert len(client.get("/api/v1/books").json()) == before
+
+    def test_bulk_create_error_goes_through_validation_handler(self, monkeypatch):
+        """422 формирует общий обработчик валидации и пишет запись аудита"""
+        records = []
+        monkeypatch.setattr(
+            main, "audit", lambda event, **fields: records.append((event, fields))
+        )
+        response = client.post(
+            "/api/v1/books/bulk", json=[{"title": "", "author": "A"}]
+        )
+
+        assert response.status_code == 422
+        data = response.json()
+        assert data["detail"] == "One or more books failed validation"
+        assert data["type"].endswith("/validation-error")
+        assert [e["index"] for e in data["errors"]] == [0]
+        assert records == [("error", {k: v for k, v in data.items() if k != "errors"})]
+
+    def test_bulk_create_partial(self):
+        """С partial=true валидные книги сохраняются, ошибки — по индексам"""
+        items = [
+            {"title": "Partial ok", "author": "A"},
+            {"author": "A"},
+            "not an object",
+            {"title": "Partial ok 2", "author": "B"},
+        ]
+        response = client.post(
+            "/api/v1/books/bulk", params={"partial": "true"}, json=items
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [e["index"] for e in data["errors"]] == [1, 2]
+        assert data["ids"][1] is None and data["ids"][2] is None
+        assert data["ids"][0] is not None and data["ids"][3] is not None
+        assert "not an object" not in str(data["errors"])
+
+    def test_bulk_create_too_many(self):
+        """Слишком большой массив отклоняется целиком"""
+        items = [{"title": "T", "author": "A"}] * 1001
+        response = client.post("/api/v1/books/bulk", json=items)
+        assert response.status_code == 422
+
+
+class TestBulkStatus:
+    """Тесты пакетного изменения статусов"""
+
+    def test_bulk_status_per_item_results(self):
+        """Каждый элемент получает свой результат, валидные применяются"""
+        ids = client.post(
+            "/api/v1/books/bulk",
+            json=[{"title": f"Shelf {i}", "author": "A"} for i in range(2)],
+        ).json()["ids"]
+
+        response = client.patch(
+            "/api/v1/books/bulk/status",
+            json=[
+                {"id": ids[0], "status": "in_progress"},
+                {"id": ids[0], "status": "completed"},
+                {"id": ids[1], "status": "completed"},
+                {"id": 999999, "status": "completed"},
+            ],
+        )
+
+        assert response.status_code == 200
+        assert [r["status_code"] for r in response.json()] == [200, 200, 400, 404]
+        assert client.get(f"/api/v1/books/{ids[0]}").json()["status"] == "completed"
+        assert client.get(f"/api/v1/books/{ids[1]}").json()["status"] == "to_read"
+
+    def test_bulk_status_invalid_enum(self):
+        """Неизвестный статус — ошибка валидации всего запроса"""
+        response = client.patch(
+            "/api/v1/books/bulk/status", json=[{"id": 1, "status": "lost"}]
+        )
+        assert response.status_code == 422
@@ -0,0 +1,181 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.storage.cache import CachedStorage, LRUCache, SearchCache
+from app.storage.database import get_storage, search_cache
+
+client = TestClient(app)
+
+
+class TestLRUCache:
+    """Тесты LRU-кеша"""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+
+        assert cache.get(2) is None
+        assert cache.get(1) == "a"
+        assert cache.get(3) == "c"
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr("app.storage.cache.time.monotonic", lambda: now[0])
+        cache = LRUCache(maxsize=10, ttl=5)
+        cache.put(1, "a")
+
+        now[0] += 6
+        assert cache.get(1) is None
+        assert cache.stats()["expirations"] == 1
+
+
+class TestCachedStorage:
+    """Тесты read-through кеша поверх SQL-хранилища"""
+
+    @pytest.fixture
+    def cached(self, sql_storage):
+        return CachedStorage(sql_storage, LRUCache(maxsize=100, ttl=60))
+
+    def test_second_read_is_a_hit(self, cached):
+        book = cached.create_book(title="Dune", author="Frank Herbert")
+
+        cached.get_book_by_id(book.id)
+        cached.get_book_by_id(book.id)
+
+        stats = cached.cache_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+
+    def test_writes_invalidate(self, cached):
+        book = cached.create_book(title="Dune", author="Frank Herbert")
+        cached.get_book_by_id(book.id)
+
+        cached.update_book(book.id, title="Dune Messiah")
+        assert cached.get_book_by_id(book.id).title == "Dune Messiah"
+
+        cached.update_statuses([(book.id, "in_progress")], lambda current, new: None)
+        assert cached.get_book_by_id(book.id).status == "in_progress"
+
+        cached.delete_book(book.id)
+        assert cached.get_book_by_id(book.id) is None
+
+    def test_unit_of_work_reads_own_writes(self, cached):
+        book = cached.create_book(title="Old", author="A")
+        cached.get_book_by_id(book.id)
+
+        with cached.unit_of_work() as uow:
+            uow.update_book(book.id, title="New")
+            assert uow.get_book_by_id(book.id).title == "New"
+            # Параллельный читатель успел закешировать ещё не закоммиченное старое
+            cached.cache.put(book.id, book)
+
+        assert cached.get_book_by_id(book.id).title == "New"
+
+    def test_read_racing_a_write_is_not_cached(self, cached, monkeypatch):
+        """Значение, прочитанное до коммита параллельной записи, не кешируется"""
+        book = cached.create_book(title="Old", author="A")
+        inner_get = cached.inner.get_book_by_id
+
+        def racing_get(book_id):
+            stale = inner_get(book_id)
+            # Писатель коммитит и инвалидирует, пока читатель ещё не положил
+            # прочитанное в кеш
+            cached.update_book(book_id, title="New")
+            return stale
+
+        monkeypatch.setattr(cached.inner, "get_book_by_id", racing_get)
+        assert cached.get_book_by_id(book.id).title == "Old"
+        monkeypatch.setattr(cached.inner, "get_book_by_id", inner_get)
+
+        assert cached.get_book_by_id(book.id).title == "New"
+
+
+class TestSearchCache:
+    """Тесты кеша результатов поиска"""
+
+    def test_hit_until_generation_changes(self):
+        events = []
+        cache = SearchCache(max_entries=10, max_bytes=1024, hook=events.append)
+
+        assert cache.get("dune", 1) is None
+        cache.put("dune", 1, b"[]")
+        assert cache.get("dune", 1) == b"[]"
+        assert cache.get("dune", 2) is None
+
+        assert events == ["miss", "hit", "invalidation", "miss"]
+        assert cache.stats()["hit_rate"] == pytest.approx(1 / 3)
+
+    def test_stale_generation_is_not_stored(self):
+        cache = SearchCache(max_entries=10, max_bytes=1024)
+        cache.get("dune", 2)
+
+        cache.put("dune", 1, b"[]")
+        assert cache.get("dune", 2) is None
+
+    def test_other_worker_write_invalidates(self, shared_sql_storages, monkeypatch):
+        """Кеш поиска воркера сбрасывается после записи другого воркера"""
+        from app.api.endpoints import books
+
+        writer, reader = shared_sql_storages
+        cache = SearchCache(max_entries=10, max_bytes=1024 * 1024)
+        monkeypatch.setattr(books, "search_cache", cache)
+
+        def reader_storage():
+            with reader.unit_of_work() as storage:
+                yield storage
+
+        def search():
+            response = client.get("/api/v1/books/search", params={"q": "dune"})
+            return [book["title"] for book in response.json()]
+
+        app.dependency_overrides[get_storage] = reader_storage
+        try:
+            writer.create_book(title="Dune", author="Frank Herbert")
+            assert search() == ["Dune"]
+            assert search() == ["Dune"]
+            assert cache.hits == 1
+            writer.create_book(title="Dune Messiah", author="Frank Herbert")
+            assert search() == ["Dune", "Dune Messiah"]
+        finally:
+            app.dependency_overrides.pop(get_storage)
+
+    def test_evicts_by_entries_and_bytes(self):
+        cache = SearchCache(max_entries=2, max_bytes=10)
+        cache.put("a", 1, b"1234")
+        cache.put("b", 1, b"1234")
+        cache.get("a", 1)
+        cache.put("c", 1, b"1234")
+
+        assert cache.get("b", 1) is None
+        cache.put("d", 1, b"12345678")
+        assert cache.stats()["bytes"] <= 10
+        assert cache.get("d", 1) == b"12345678"
+
+        cache.put("huge", 1, b"x" * 11)
+        assert cache.get("huge", 1) is None
+
+
+class TestSearchEndpointCache:
+    """Кеш поиска в эндпоинте"""
+
+    def test_normalized_hits_and_invalidation(self):
+        client.post("/api/v1/books", json={"title": "Cachedsearch One", "author": "A"})
+        hits = search_cache.hits
+
+        first = client.get("/api/v1/books/search", params={"q": "cachedsearch"})
+        second = client.get("/api/v1/books/search", params={"q": "  CachedSearch "})
+        assert second.json() == first.json()
+        assert search_cache.hits == hits + 1
+
+        client.post("/api/v1/books", json={"title": "Cachedsearch Two", "author": "A"})
+        third = client.get("/api/v1/books/search", params={"q": "cachedsearch"})
+        assert len(third.json()) == len(first.json()) + 1
+
+    def test_blank_query(self):
+        response = client.get("/api/v1/books/search", params={"q": "   "})
+        assert response.status_code == 200
+        assert response.json() == []
@@ -0,0 +1,66 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+class TestBookETag:
+    """Условные GET для одной книги"""
+
+    def test_not_modified_until_update(self):
+        book = client.post(
+            "/api/v1/books", json={"title": "Etag", "author": "A"}
+        ).json()
+        url = f"/api/v1/books/{book['id']}"
+
+        etag = client.get(url).headers["ETag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+        client.put(url, json={"title": "Etag 2"})
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_weak_and_listed_tags(self):
+        book = client.post(
+            "/api/v1/books", json={"title": "Weak", "author": "A"}
+        ).json()
+        url = f"/api/v1/books/{book['id']}"
+        etag = client.get(url).headers["ETag"]
+
+        response = client.get(url, headers={"If-None-Match": f'"other", W/{etag}'})
+        assert response.status_code == 304
+
+
+class TestListETag:
+    """Условные GET для списка книг"""
+
+    def test_not_modified_until_any_write(self):
+        client.post("/api/v1/books", json={"title": "List", "author": "A"})
+
+        etag = client.get("/api/v1/books").headers["ETag"]
+        assert (
+            client.get("/api/v1/books", headers={"If-None-Match": etag}).status_code
+            == 304
+        )
+
+        client.post("/api/v1/books", json={"title": "List 2", "author": "A"})
+        response = client.get("/api/v1/books", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_representations_have_distinct_tags(self):
+        json_etag = client.get("/api/v1/books").headers["ETag"]
+        ndjson = client.get("/api/v1/books", headers={"Accept": "application/x-ndjson"})
+
+        assert ndjson.headers["ETag"] != json_etag
+        assert ndjson.headers["Vary"] == "Accept"
+        response = client.get(
+            "/api/v1/books",
+            headers={"Accept": "application/x-ndjson", "If-None-Match": json_etag},
+        )
+        assert response.status_code == 200
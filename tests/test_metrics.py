@@ -0,0 +1,68 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import Counter, Histogram
+
+client = TestClient(app)
+
+
+class TestMetricPrimitives:
+    """Счётчики и гистограммы с шардами по потокам"""
+
+    def test_counter_merges_thread_shards(self):
+        counter = Counter("test_total", "Test", ("kind",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc("a")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.values() == {("a",): 4000}
+        assert 'test_total{kind="a"} 4000' in counter.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_seconds", "Test", ("op",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe("read", value=value)
+
+        lines = histogram.render()
+        assert 'test_seconds_bucket{op="read",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{op="read",le="1"} 2' in lines
+        assert 'test_seconds_bucket{op="read",le="+Inf"} 3' in lines
+        assert 'test_seconds_count{op="read"} 3' in lines
+        assert 'test_seconds_sum{op="read"} 5.55' in lines
+
+
+class TestMetricsEndpoint:
+    """Эндпоинт /metrics"""
+
+    def test_route_templates_and_storage_timings(self):
+        book = client.post("/api/v1/books", json={"title": "Metric", "author": "A"})
+        client.get(f"/api/v1/books/{book.json()['id']}")
+        client.get("/api/v1/books/999999")
+        client.get("/no/such/path")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+
+        assert (
+            'http_requests_total{method="GET",route="/api/v1/books/{book_id}",'
+            'status="200"}' in body
+        )
+        assert 'route="/api/v1/books/{book_id}",status="404"}' in body
+        assert 'route="<unmatched>"' in body
+        assert "/no/such/path" not in body
+        assert 'http_request_duration_seconds_bucket{method="GET",' in body
+        assert "# TYPE http_requests_in_flight gauge" in body
+        assert 'operation="get_book_by_id"' in body
+        assert "search_cache_hit_rate" in body
+        assert "audit_dropped" in body
@@ -0,0 +1,395 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.metrics import RATE_LIMIT_REJECTIONS
+from app.middleware import rate_limit_backends
+from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware, RouteCost
+from app.middleware.rate_limit_backends import (
+    MemoryRateLimitBackend,
+    SlidingWindowCounter,
+    SQLiteRateLimitBackend,
+)
+from app.middleware.request_size import RequestSizeLimitMiddleware
+
+
+def _make_client(**rate_limits) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("secret details")
+
+    @app.get("/correlation")
+    def correlation(request: Request):
+        return {"correlation_id": request.state.correlation_id}
+
+    @app.post("/api/v1/books/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]), media_type="text/plain")
+
+    app.add_middleware(RequestSizeLimitMiddleware, max_body_size=100)
+    app.add_middleware(RateLimitMiddleware, **rate_limits)
+    app.add_middleware(ErrorHandlerMiddleware)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+class TestASGIMiddlewareStack:
+    """Тесты ASGI-middleware: ошибки, размер тела, rate limit"""
+
+    def test_unhandled_error_is_problem_details(self):
+        response = _make_client().get("/boom")
+
+        assert response.status_code == 500
+        body = response.json()
+        assert body["type"] == "https://api.readinglist.com/errors/internal-error"
+        assert body["instance"] == "/boom"
+        assert body["correlation_id"]
+        assert "secret" not in response.text
+
+    def test_correlation_id_in_request_state(self):
+        assert _make_client().get("/correlation").json()["correlation_id"]
+
+    def test_body_is_replayed_to_endpoint(self):
+        response = _make_client().post("/api/v1/books/echo", content=b"x" * 100)
+        assert response.json() == {"size": 100}
+
+    def test_oversized_body(self):
+        response = _make_client().post("/api/v1/books/echo", content=b"x" * 101)
+
+        assert response.status_code == 413
+        assert response.json()["title"] == "Payload Too Large"
+
+    def test_rate_limit_retry_after(self):
+        client = _make_client(post_limit=2)
+        statuses = [
+            client.post("/api/v1/books/echo", content=b"{}").status_code
+            for _ in range(3)
+        ]
+
+        assert statuses == [200, 200, 429]
+        response = client.post("/api/v1/books/echo", content=b"{}")
+        assert int(response.headers["Retry-After"]) > 0
+        assert response.json()["status"] == 429
+
+    def test_streaming_passes_through(self):
+        response = _make_client().get("/stream")
+        assert response.text == "abc"
+
+
+def _run_asgi(middleware, chunks, headers=()) -> int:
+    """Прогнать один POST с телом из ``chunks`` через middleware; вернуть статус."""
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/upload",
+        "raw_path": b"/upload",
+        "query_string": b"",
+        "root_path": "",
+        "scheme": "http",
+        "server": ("test", 80),
+        "headers": list(headers),
+    }
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"]
+
+
+class TestStreamingBodyLimit:
+    """Лимит тела проверяется по чанкам, без буферизации"""
+
+    @staticmethod
+    def _app(received):
+        async def app(scope, receive, send):
+            while True:
+                message = await receive()
+                received.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        return app
+
+    def test_chunks_pass_through(self):
+        received = []
+        middleware = RequestSizeLimitMiddleware(self._app(received), max_body_size=10)
+
+        status = _run_asgi(middleware, [b"12345", b"67890"])
+
+        assert status == 200
+        assert received == [b"12345", b"67890"]
+
+    def test_rejects_mid_stream(self):
+        received = []
+        middleware = RequestSizeLimitMiddleware(self._app(received), max_body_size=10)
+
+        status = _run_asgi(middleware, [b"123456", b"789012", b"never"])
+
+        assert status == 413
+        # Третий чанк не читается: отказ сразу на превышении
+        assert received == [b"123456"]
+
+    def test_rejects_declared_content_length(self):
+        received = []
+        middleware = RequestSizeLimitMiddleware(self._app(received), max_body_size=10)
+
+        status = _run_asgi(middleware, [b"1"], headers=[(b"content-length", b"11")])
+
+        assert status == 413
+        assert received == []
+
+    def test_fastapi_endpoint_gets_problem_details(self):
+        response = _make_client().post(
+            "/api/v1/books/echo",
+            content=iter([b"x" * 60, b"x" * 60]),
+        )
+
+        assert response.status_code == 413
+        assert response.json()["type"].endswith("/payload-too-large")
+
+
+class TestSlidingWindowRateLimit:
+    """Счётчик скользящего окна и вытеснение клиентов"""
+
+    def test_counter_weights_previous_window(self):
+        counter = SlidingWindowCounter(window=10, start=0)
+        for _ in range(10):
+            counter.add(now=1)
+
+        assert counter.count(now=5) == 10
+        # Прошла четверть следующего окна: из прошлых 10 событий учитываем 7.5
+        assert counter.count(now=12.5) == pytest.approx(7.5)
+        assert counter.count(now=25) == 0
+
+    def test_retry_after_frees_one_slot(self):
+        counter = SlidingWindowCounter(window=10, start=0)
+        for _ in range(10):
+            counter.add(now=0)
+
+        wait = counter.retry_after(now=5, limit=10)
+        assert counter.count(now=5 + wait) == pytest.approx(9)
+
+    def test_idle_clients_are_evicted_and_capped(self):
+        backend = MemoryRateLimitBackend(window=10, max_clients=3)
+        for i in range(5):
+            backend.acquire(f"10.0.0.{i}", [("requests", 100, 1)], now=0)
+        assert list(backend.clients) == ["10.0.0.2", "10.0.0.3", "10.0.0.4"]
+
+        backend.acquire("10.0.0.9", [("requests", 100, 1)], now=25)
+        assert list(backend.clients) == ["10.0.0.9"]
+
+
+class TestSQLiteRateLimitBackend:
+    """Общие для процессов счётчики в SQLite"""
+
+    def test_limit_is_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "ratelimit.db")
+        # Два экземпляра с одним файлом — как два воркера uvicorn
+        workers = [
+            SQLiteRateLimitBackend(path, window=60, max_clients=10) for _ in "ab"
+        ]
+        limits = [("posts", 3, 1), ("requests", 100, 1)]
+
+        results = [workers[i % 2].acquire("10.0.0.1", limits, now=1) for i in range(4)]
+
+        assert results[:3] == [None, None, None]
+        assert results[3][0] == "posts" and results[3][1] > 0
+        # Отказ не учитывается: общий счётчик остался на 3
+        assert workers[0].acquire("10.0.0.1", [("requests", 4, 1)], now=1) is None
+        assert workers[1].acquire("10.0.0.1", [("requests", 4, 1)], now=1) is not None
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+    def test_database_file_is_private(self, tmp_path, monkeypatch):
+        path = tmp_path / "rl.db"
+        backend = SQLiteRateLimitBackend(str(path), window=60, max_clients=10)
+        backend.acquire("10.0.0.1", [("requests", 100, 1)], now=1)
+        backend.close()
+        assert path.stat().st_mode & 0o777 == 0o600
+
+        # Симлинк на чужой файл и файл другого пользователя не открываются
+        link = tmp_path / "link.db"
+        link.symlink_to(path)
+        with pytest.raises(OSError):
+            SQLiteRateLimitBackend(str(link), 60, 10).acquire("a", [], now=1)
+        monkeypatch.setattr(os, "getuid", lambda: path.stat().st_uid + 1)
+        with pytest.raises(PermissionError):
+            SQLiteRateLimitBackend(str(path), 60, 10).acquire("a", [], now=1)
+
+    def test_sweeps_idle_and_caps_clients(self, tmp_path):
+        backend = SQLiteRateLimitBackend(
+            str(tmp_path / "rl.db"), window=10, max_clients=2
+        )
+        for i in range(4):
+            backend.acquire(f"10.0.0.{i}", [("requests", 100, 1)], now=i * 5)
+
+        def clients():
+            rows = backend._connection().execute("SELECT client FROM rate_limit")
+            return {row[0] for row in rows}
+
+        # Запросы сами не чистят таблицу — это делает фоновый поток
+        assert len(clients()) == 4
+
+        # 10.0.0.0 простаивает дольше двух окон, 10.0.0.1 — лишний сверх max_clients
+        assert backend.sweep(now=21) == 2
+        assert clients() == {"10.0.0.2", "10.0.0.3"}
+        backend.close()
+
+    def test_sweeps_in_batches(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(rate_limit_backends, "SWEEP_BATCH", 3)
+        backend = SQLiteRateLimitBackend(
+            str(tmp_path / "rl.db"), window=10, max_clients=2
+        )
+        for i in range(10):
+            backend.acquire(f"10.0.0.{i}", [("requests", 100, 1)], now=i)
+
+        assert backend.sweep(now=9) == 8
+        assert backend.sweep(now=100) == 2
+        backend.close()
+
+    def test_blocking_backend_runs_off_event_loop(self, tmp_path):
+        import threading
+
+        backend = SQLiteRateLimitBackend(str(tmp_path / "rl.db"), 60, 100)
+        acquire = backend.acquire
+        threads = []
+
+        def recording_acquire(*args):
+            threads.append(threading.current_thread())
+            return acquire(*args)
+
+        backend.acquire = recording_acquire
+        app = FastAPI()
+
+        @app.get("/ping")
+        async def ping():
+            return {"loop": threading.current_thread().name}
+
+        app.add_middleware(RateLimitMiddleware, backend=backend)
+        response = TestClient(app).get("/ping")
+
+        assert response.status_code == 200
+        assert threads[0].name != response.json()["loop"]
+        backend.close()
+
+
+class TestCostWeightedRateLimit:
+    """Веса и бюджеты маршрутов"""
+
+    @staticmethod
+    def _client(**options) -> TestClient:
+        app = FastAPI()
+
+        @app.get("/api/v1/books/search")
+        def search():
+            return []
+
+        @app.get("/api/v1/books/{book_id}")
+        def get_book(book_id: int):
+            return {"id": book_id}
+
+        @app.post("/api/v1/books/")
+        def create_book():
+            return {}
+
+        @app.post("/api/v1/books/bulk")
+        def bulk_create_books():
+            return {}
+
+        app.add_middleware(
+            RateLimitMiddleware, backend=MemoryRateLimitBackend(60, 100), **options
+        )
+        return TestClient(app)
+
+    def test_search_has_own_budget(self):
+        client = self._client(
+            route_costs=[
+                RouteCost("GET", r"/api/v1/books/search$", 5, "search", budget=10)
+            ]
+        )
+
+        statuses = [
+            client.get("/api/v1/books/search?q=a").status_code for _ in range(3)
+        ]
+        assert statuses == [200, 200, 429]
+        # Дешёвые запросы бюджет поиска не трогают
+        assert client.get("/api/v1/books/1").status_code == 200
+
+    def test_cost_drains_global_budget(self):
+        client = self._client(
+            global_limit=10, route_costs=[RouteCost("GET", r"/api/v1/books/search$", 4)]
+        )
+
+        assert client.get("/api/v1/books/search?q=a").status_code == 200
+        assert client.get("/api/v1/books/search?q=a").status_code == 200
+        # Осталось 2 единицы: поиск (4) не влезает, чтение книги (1) — да
+        assert client.get("/api/v1/books/search?q=a").status_code == 429
+        assert client.get("/api/v1/books/1").status_code == 200
+
+    def test_bulk_posts_count_against_post_limit(self):
+        """Пакетный POST списывает и бюджет bulk, и post_limit"""
+        client = self._client(post_limit=2)
+
+        assert client.post("/api/v1/books/").status_code == 200
+        assert client.post("/api/v1/books/bulk").status_code == 200
+        # post_limit исчерпан: ни одиночный, ни пакетный POST не проходят
+        assert client.post("/api/v1/books/bulk").status_code == 429
+        assert client.post("/api/v1/books/").status_code == 429
+        assert client.get("/api/v1/books/1").status_code == 200
+
+    def test_rejection_counted_under_refusing_budget(self):
+        """Метрика отказов помечается бюджетом, который отказал"""
+        client = self._client(global_limit=10)
+
+        def rejections(budget):
+            return RATE_LIMIT_REJECTIONS.values().get((budget,), 0)
+
+        before = {name: rejections(name) for name in ("search", "requests")}
+        statuses = [client.get("/api/v1/books/1").status_code for _ in range(10)]
+        assert statuses == [200] * 10
+        # Общий бюджет исчерпан, бюджет поиска ещё нет
+        assert client.get("/api/v1/books/search?q=a").status_code == 429
+
+        assert rejections("requests") == before["requests"] + 1
+        assert rejections("search") == before["search"]
+
+    def test_invalid_budget(self):
+        with pytest.raises(ValueError):
+            RouteCost("GET", r"/x", cost=5, name="x", budget=4)
+
+    def test_small_limits_still_construct(self):
+        """Конфигурации, валидные до весов маршрутов, не падают при старте"""
+        small = RateLimitMiddleware(
+            None, global_limit=10, backend=MemoryRateLimitBackend(60, 100)
+        )
+        assert all(route.cost <= 10 for route in small.route_costs)
+        assert all(
+            route.budget is None or route.budget <= 10 for route in small.route_costs
+        )
+        RateLimitMiddleware(None, post_limit=0, backend=MemoryRateLimitBackend(60, 100))
+
+    def test_zero_post_limit_rejects_posts(self):
+        response = _make_client(post_limit=0).post("/api/v1/books/echo", content=b"{}")
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) == 60
@@ -0,0 +1,88 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.storage.pagination import decode_cursor, encode_cursor
+
+client = TestClient(app)
+
+
+class TestKeysetPagination:
+    """Тесты keyset-пагинации списка книг"""
+
+    def test_pages_cover_full_list(self):
+        """Обход по курсорам даёт тот же список, что и запрос без пагинации"""
+        for i in range(7):
+            client.post("/api/v1/books", json={"title": f"Page {i}", "author": "A"})
+
+        full = client.get("/api/v1/books").json()
+
+        collected = []
+        params = {"limit": 3}
+        while True:
+            response = client.get("/api/v1/books", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) <= 3
+            collected.extend(page)
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if not next_cursor:
+                break
+            params = {"limit": 3, "cursor": next_cursor}
+
+        assert [b["id"] for b in collected] == [b["id"] for b in full]
+
+    def test_invalid_cursor(self):
+        """Испорченный курсор — 400, а не 500"""
+        response = client.get("/api/v1/books", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    def test_cursor_beyond_64_bits(self):
+        """id больше 64 бит — 400, а не OverflowError в SQL-драйвере"""
+        cursor = encode_cursor(2**63)
+        response = client.get("/api/v1/books", params={"cursor": cursor})
+        assert response.status_code == 400
+        assert decode_cursor(encode_cursor(2**63 - 1)) == 2**63 - 1
+
+    def test_limit_bounds(self):
+        """limit вне допустимого диапазона — ошибка валидации"""
+        assert client.get("/api/v1/books", params={"limit": 0}).status_code == 422
+        assert client.get("/api/v1/books", params={"limit": 10_000}).status_code == 422
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(42)) == 42
+
+
+@pytest.mark.parametrize("cursor", ["", "e30", "eyJpZCI6ICJ4In0", "!!!"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_memory_page_is_consistent_with_concurrent_delete():
+    """Удаление между чтением id и книг не ломает страницу (KeyError -> 500)"""
+    import threading
+
+    from app.storage.memory import MemoryStorage
+
+    storage = MemoryStorage()
+    storage.bulk_create_books([{"title": f"B{i}", "author": "A"} for i in range(5)])
+    page_after = storage.sorted_ids.page_after
+    deleter = threading.Thread(target=storage.delete_book, args=(1,))
+
+    def page_after_then_delete(after_id, limit):
+        ids = page_after(after_id, limit)
+        # Удаление из другого потока до того, как страница собрана
+        deleter.start()
+        deleter.join(timeout=0.2)
+        return ids
+
+    storage.sorted_ids.page_after = page_after_then_delete
+
+    page = storage.get_books_page(0, 5)
+    deleter.join()
+
+    assert [book.id for book in page] == [1, 2, 3, 4, 5]
+    storage.sorted_ids.page_after = page_after
+    assert [book.id for book in storage.get_books_page(0, 5)] == [2, 3, 4, 5]
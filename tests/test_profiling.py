@@ -0,0 +1,128 @@
+import pstats
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import admin
+from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.profiling import RequestProfiler
+
+TOKEN = "admin-secret"
+
+
+def slow_endpoint_work() -> int:
+    deadline = time.perf_counter() + 0.05
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    profiler = RequestProfiler(TOKEN, interval_ms=1)
+    monkeypatch.setattr(admin, "request_profiler", profiler)
+    return profiler
+
+
+@pytest.fixture
+def client(profiler):
+    app = FastAPI()
+
+    @app.get("/slow")
+    def slow():
+        return {"total": slow_endpoint_work()}
+
+    app.include_router(admin.router)
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    app.add_middleware(ErrorHandlerMiddleware)
+    return TestClient(app)
+
+
+class TestRequestProfiling:
+    """Профилирование запросов по токену администратора"""
+
+    def test_not_profiled_without_header(self, client, profiler):
+        response = client.get("/slow")
+
+        assert "x-profile-id" not in response.headers
+        assert profiler.recent() == []
+
+    def test_wrong_token_is_ignored(self, client, profiler):
+        response = client.get("/slow", headers={"X-Profile": "guess"})
+
+        assert "x-profile-id" not in response.headers
+        assert profiler.recent() == []
+
+    def test_collapsed_profile_by_correlation_id(self, client):
+        response = client.get("/slow", headers={"X-Profile": TOKEN})
+        profile_id = response.headers["x-profile-id"]
+
+        listing = client.get("/admin/profiles", headers={"X-Admin-Token": TOKEN})
+        assert listing.json()[0]["correlation_id"] == profile_id
+        assert listing.json()[0]["path"] == "/slow"
+
+        collapsed = client.get(
+            f"/admin/profiles/{profile_id}", headers={"X-Admin-Token": TOKEN}
+        )
+        assert collapsed.status_code == 200
+        assert "test_profiling.py:slow_endpoint_work" in collapsed.text
+        stack, count = collapsed.text.splitlines()[0].rsplit(" ", 1)
+        assert int(count) > 0
+
+    def test_pstats_download(self, client, tmp_path):
+        profile_id = client.get("/slow", headers={"X-Profile": TOKEN}).headers[
+            "x-profile-id"
+        ]
+
+        response = client.get(
+            f"/admin/profiles/{profile_id}",
+            params={"format": "pstats"},
+            headers={"X-Admin-Token": TOKEN},
+        )
+        assert response.status_code == 200
+        path = tmp_path / "profile.pstats"
+        path.write_bytes(response.content)
+
+        stats = pstats.Stats(str(path))
+        functions = {name for _, _, name in stats.stats}
+        assert "slow_endpoint_work" in functions
+        assert stats.total_tt > 0
+
+    def test_sample_rate_profiles_without_header(self, client, profiler):
+        profiler.sample_rate = 1.0
+
+        response = client.get("/slow")
+
+        assert profiler.get(response.headers["x-profile-id"]) is not None
+
+    def test_old_profiles_are_evicted(self, client, profiler):
+        profiler.max_profiles = 2
+        ids = [
+            client.get("/slow", headers={"X-Profile": TOKEN}).headers["x-profile-id"]
+            for _ in range(3)
+        ]
+
+        assert [p.correlation_id for p in profiler.recent()] == ids[:0:-1]
+
+
+class TestAdminAccess:
+    """Доступ к профилям только с токеном"""
+
+    def test_wrong_admin_token_is_forbidden(self, client):
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "guess"})
+        assert response.status_code == 403
+
+    def test_unknown_profile(self, client):
+        response = client.get(
+            "/admin/profiles/missing", headers={"X-Admin-Token": TOKEN}
+        )
+        assert response.status_code == 404
+
+    def test_disabled_without_token(self, client, profiler):
+        profiler.admin_token = ""
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": ""})
+        assert response.status_code == 404
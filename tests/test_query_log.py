@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.metrics import REGISTRY  # noqa: E402
+from app.storage.query_log import QueryLog, current_queries, track_queries  # noqa: E402
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(
+            text("INSERT INTO items (name) VALUES (:name)"),
+            [{"name": f"item-{i}"} for i in range(5)],
+        )
+    yield engine
+    engine.dispose()
+
+
+def test_counts_queries_of_tracked_request(engine):
+    QueryLog(slow_threshold_ms=10_000).instrument(engine)
+
+    with track_queries("req-1") as queries:
+        assert current_queries() is queries
+        with engine.begin() as conn:
+            conn.execute(text("SELECT * FROM items")).all()
+            conn.execute(text("UPDATE items SET name = 'x' WHERE id <= 2"))
+
+    assert current_queries() is None
+    assert queries.correlation_id == "req-1"
+    assert queries.count == 2
+    assert queries.rows == 2
+    assert queries.repeated == []
+
+
+def test_slow_queries_carry_correlation_id(engine):
+    log = QueryLog(slow_threshold_ms=0)
+    log.instrument(engine)
+
+    with track_queries("req-slow"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT name FROM items WHERE id = 1")).all()
+
+    entry = log.slow_queries[-1]
+    assert entry["correlation_id"] == "req-slow"
+    assert entry["statement"] == "SELECT name FROM items WHERE id = 1"
+    assert entry["duration_ms"] >= 0
+    assert 'sql_slow_queries_total{statement="select"}' in REGISTRY.render()
+
+
+def test_repeated_statement_is_flagged_as_n_plus_one(engine, caplog):
+    QueryLog(slow_threshold_ms=10_000, n_plus_one_threshold=3).instrument(engine)
+
+    with track_queries("req-n1") as queries:
+        with engine.connect() as conn:
+            for book_id in range(1, 6):
+                conn.execute(
+                    text("SELECT name FROM items WHERE id = :id"), {"id": book_id}
+                ).all()
+
+    assert queries.repeated == ["SELECT name FROM items WHERE id = ?"]
+    assert "possible N+1" in caplog.text
+    assert "req-n1" in caplog.text
+    assert "sql_n_plus_one_total" in REGISTRY.render()
+
+
+def test_executemany_is_not_n_plus_one(engine):
+    QueryLog(slow_threshold_ms=10_000, n_plus_one_threshold=1).instrument(engine)
+
+    with track_queries("req-bulk") as queries:
+        with engine.begin() as conn:
+            for _ in range(3):
+                conn.execute(
+                    text("INSERT INTO items (name) VALUES (:name)"),
+                    [{"name": "a"}, {"name": "b"}],
+                )
+
+    assert queries.count == 3
+    assert queries.repeated == []
@@ -0,0 +1,31 @@
+from app.storage.memory import MemoryStorage
+from app.storage.search_index import TrigramIndex
+
+
+class TestTrigramIndex:
+    """Триграммный индекс in-memory хранилища"""
+
+    def test_update_touches_only_changed_grams(self):
+        index = TrigramIndex()
+        index.add(1, ("Dune", "Frank Herbert"))
+
+        index.update(1, ("Dune", "Frank Herbert"), ("Dune", "Brian Herbert"))
+
+        assert index.candidates("frank") == set()
+        assert index.candidates("brian") == {1}
+        assert index.candidates("dune") == {1}
+
+    def test_storage_leaves_no_stale_postings(self):
+        storage = MemoryStorage()
+        book = storage.create_book(title="Dune", author="Frank Herbert")
+        other = storage.create_book(title="Emma", author="Jane Austen")
+
+        storage.update_book(book.id, title="Children of Dune")
+        storage.update_book(book.id, title="Dune Messiah")
+        assert storage.search_index.candidates("children") == set()
+        assert storage.search_index.candidates("messiah") == {book.id}
+
+        storage.delete_book(book.id)
+        postings = storage.search_index._postings
+        assert all(postings.values())
+        assert set().union(*postings.values()) == {other.id}
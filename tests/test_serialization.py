@@ -0,0 +1,57 @@
+import json
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+from app.api.serialization import BookJSONCache, book_to_dict
+from app.main import app
+from app.storage.base import InMemoryBook
+
+client = TestClient(app)
+
+
+class TestBookJSONCache:
+    """Тесты кеша закодированных книг"""
+
+    def test_reuses_fragment_until_version_changes(self):
+        cache = BookJSONCache(maxsize=10)
+        book = InMemoryBook(id=1, title="Дюна", author="Frank Herbert")
+
+        first = cache.encode(book)
+        assert cache.encode(book) is first
+        assert json.loads(first) == book_to_dict(book)
+
+        book.title = "Дюна 2"
+        book.updated_at += timedelta(microseconds=1)
+        assert json.loads(cache.encode(book))["title"] == "Дюна 2"
+
+    def test_bounded(self):
+        cache = BookJSONCache(maxsize=2)
+        books = [InMemoryBook(id=i, title="T", author="A") for i in range(3)]
+        fragments = [cache.encode(book) for book in books]
+
+        assert cache.encode(books[2]) is fragments[2]
+        assert cache.encode(books[0]) is not fragments[0]
+
+
+class TestPreSerializedResponses:
+    """Ответы из закешированных фрагментов совпадают с данными книг"""
+
+    def test_list_reflects_updates(self):
+        book = client.post(
+            "/api/v1/books", json={"title": "Frag", "author": "A"}
+        ).json()
+        client.get("/api/v1/books")
+
+        client.put(f"/api/v1/books/{book['id']}", json={"title": "Frag 2"})
+
+        listed = {b["id"]: b for b in client.get("/api/v1/books").json()}
+        assert listed[book["id"]]["title"] == "Frag 2"
+        assert client.get(f"/api/v1/books/{book['id']}").json() == listed[book["id"]]
+
+    def test_non_ascii_is_utf8(self):
+        response = client.post(
+            "/api/v1/books", json={"title": "Мастер", "author": "Булгаков"}
+        )
+        assert "Мастер".encode() in response.content
+        assert response.headers["content-type"] == "application/json"
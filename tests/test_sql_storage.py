@@ -0,0 +1,147 @@
+"""Тесты, специфичные для SQL-бэкенда."""
+
+
+def test_fts_search_matches_like(sql_storage):
+    """FTS5-поиск возвращает то же, что и ILIKE-поиск"""
+    sql_storage.create_book(title="Clean Code", author="Robert Martin")
+    sql_storage.create_book(title="Refactoring", author="Martin Fowler")
+    sql_storage.create_book(title="1984", author="George Orwell")
+    sql_storage.create_book(title="100% Pure_Code", author="A")
+
+    queries = ["clean", "MARTIN", "fowl", '"quoted"', "' OR '1'='1", "19", "zzz"]
+    queries += ["0% pure", "e_code", "%%%", "___"]
+    with_fts = {q: [b.id for b in sql_storage.search_books(q)] for q in queries}
+    assert sql_storage.fts_enabled is True
+
+    sql_storage.fts_enabled = False
+    with_like = {q: sorted(b.id for b in sql_storage.search_books(q)) for q in queries}
+    assert with_fts == with_like
+
+
+def test_fts_follows_update_and_delete(sql_storage):
+    """Триггеры поддерживают индекс в актуальном состоянии"""
+    book = sql_storage.create_book(title="Dune", author="Frank Herbert")
+
+    sql_storage.update_book(book.id, title="Children of Dune")
+    assert [b.id for b in sql_storage.search_books("children")] == [book.id]
+    assert sql_storage.fts_enabled is True
+
+    sql_storage.delete_book(book.id)
+    assert sql_storage.search_books("dune") == []
+
+
+def test_unit_of_work_single_connection(sql_storage):
+    """Все вызовы единицы работы идут через одно соединение и одну транзакцию"""
+    from sqlalchemy import event
+
+    checkouts = []
+    event.listen(sql_storage.engine, "checkout", lambda *args: checkouts.append(1))
+
+    with sql_storage.unit_of_work() as uow:
+        book = uow.create_book(title="Dune", author="Frank Herbert")
+        uow.update_book(book.id, title="Dune Messiah")
+        uow.update_statuses([(book.id, "in_progress")], lambda current, new: None)
+        fetched = uow.get_book_by_id(book.id)
+
+    assert len(checkouts) == 1
+    assert fetched.title == "Dune Messiah"
+    assert fetched.status == "in_progress"
+
+
+def test_unit_of_work_rolls_back_on_error(sql_storage):
+    """Исключение внутри единицы работы откатывает все её изменения"""
+    try:
+        with sql_storage.unit_of_work() as uow:
+            uow.create_book(title="Lost", author="A")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert sql_storage.get_all_books() == []
+
+
+def test_update_book_returning(sql_storage):
+    """update_book возвращает обновлённую строку и новый updated_at"""
+    book = sql_storage.create_book(title="Old", author="A")
+
+    updated = sql_storage.update_book(book.id, title="New")
+
+    assert updated.title == "New"
+    assert updated.updated_at >= book.updated_at
+
+
+def test_status_batch_locks_rows():
+    """Пакетная смена статусов читает текущие статусы с FOR UPDATE"""
+    from sqlalchemy.dialects import postgresql
+
+    from app.storage.sql import _statuses_for_update
+
+    sql = str(_statuses_for_update({2, 1}).compile(dialect=postgresql.dialect()))
+
+    assert "FOR UPDATE" in sql
+    assert "ORDER BY books.id" in sql
+
+
+def test_generation_without_queries(sql_storage):
+    """Поколение для ETag читается без обращения к базе"""
+    from sqlalchemy import event
+
+    statements = []
+    event.listen(
+        sql_storage.engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    sql_storage.generation()
+
+    assert statements == []
+
+
+def test_generation_moves_after_commit(sql_storage):
+    """Поколение растёт после коммита единицы работы, а не после отката"""
+    before = sql_storage.generation()
+    with sql_storage.unit_of_work() as uow:
+        uow.create_book(title="A", author="A")
+        uow.create_book(title="B", author="B")
+        assert sql_storage.generation() == before
+    committed = sql_storage.generation()
+    assert committed > before
+
+    try:
+        with sql_storage.unit_of_work() as uow:
+            uow.create_book(title="Lost", author="A")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert sql_storage.generation() == committed
+
+
+def test_generation_max_age(sql_storage, monkeypatch):
+    """С generation_max_age поколение обновляется само — для нескольких воркеров"""
+    from app.storage import sql
+
+    storage = sql.SQLStorage(
+        sql_storage.engine, sql_storage.session_factory, generation_max_age=5
+    )
+    clock = [1000.0]
+    monkeypatch.setattr(sql.time, "monotonic", lambda: clock[0])
+    storage._generation_expires = 1005.0
+
+    first = storage.generation()
+    assert storage.generation() == first
+    clock[0] = 1005.0
+    assert storage.generation() > first
+
+
+def test_generation_sees_other_process_writes(shared_sql_storages):
+    """Запись другого воркера в тот же файл SQLite меняет поколение"""
+    writer, reader = shared_sql_storages
+    before = reader.generation()
+    assert reader.generation() == before
+
+    writer.create_book(title="Dune", author="Frank Herbert")
+
+    assert reader.generation() > before
+    assert reader.generation_max_age == 0
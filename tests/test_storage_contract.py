@@ -0,0 +1,163 @@
+"""Контрактные тесты хранилища: одинаковы для in-memory и SQL бэкендов."""
+
+from app.api.endpoints.books import validate_status_transition
+from app.storage.base import STATUS_NOT_FOUND
+
+
+def _naive_search(storage, query):
+    q = query.lower()
+    return [
+        b.id
+        for b in storage.get_all_books()
+        if q in b.title.lower() or q in b.author.lower()
+    ]
+
+
+class TestCrud:
+    """Создание, чтение, обновление и удаление"""
+
+    def test_create_and_get(self, storage):
+        created = storage.create_book(title="Clean Code", author="Robert Martin")
+
+        assert created.id is not None
+        assert created.status == "to_read"
+        fetched = storage.get_book_by_id(created.id)
+        assert fetched.title == "Clean Code"
+        assert fetched.author == "Robert Martin"
+        assert storage.get_book_by_id(999) is None
+
+    def test_update_skips_none(self, storage):
+        book = storage.create_book(title="Old", author="A", description="Desc")
+
+        updated = storage.update_book(book.id, title="New", description=None)
+
+        assert updated.title == "New"
+        assert updated.description == "Desc"
+        assert storage.get_book_by_id(book.id).title == "New"
+        assert storage.update_book(999, title="X") is None
+
+    def test_delete(self, storage):
+        book = storage.create_book(title="Gone", author="A")
+
+        assert storage.delete_book(book.id) is True
+        assert storage.delete_book(book.id) is False
+        assert storage.get_book_by_id(book.id) is None
+
+    def test_bulk_create_keeps_order(self, storage):
+        items = [{"title": f"Bulk {i}", "author": "A"} for i in range(5)]
+
+        created = storage.bulk_create_books(items)
+
+        assert [b.title for b in created] == [item["title"] for item in items]
+        assert [b.id for b in created] == sorted(b.id for b in created)
+        assert storage.get_book_by_id(created[-1].id).title == "Bulk 4"
+        assert storage.bulk_create_books([]) == []
+
+
+class TestListing:
+    """Полный список, keyset-страницы и потоковый обход"""
+
+    def test_all_books_in_id_order(self, storage):
+        ids = [storage.create_book(title=f"B{i}", author="A").id for i in range(4)]
+        storage.delete_book(ids[1])
+
+        assert [b.id for b in storage.get_all_books()] == [ids[0], ids[2], ids[3]]
+
+    def test_books_page(self, storage):
+        ids = [storage.create_book(title=f"B{i}", author="A").id for i in range(6)]
+        storage.delete_book(ids[2])
+
+        page = storage.get_books_page(ids[0], 3)
+        assert [b.id for b in page] == [ids[1], ids[3], ids[4]]
+        assert storage.get_books_page(ids[-1], 3) == []
+
+    def test_iter_books_in_batches(self, storage):
+        ids = [storage.create_book(title=f"B{i}", author="A").id for i in range(5)]
+        storage.delete_book(ids[1])
+
+        streamed = [b.id for b in storage.iter_books(batch_size=2)]
+        assert streamed == [b.id for b in storage.get_all_books()]
+
+
+class TestSearch:
+    """Поиск по подстроке без учёта регистра"""
+
+    def test_matches_substring_semantics(self, storage):
+        storage.create_book(title="Clean Code", author="Robert Martin")
+        storage.create_book(title="The Clean Coder", author="Robert C. Martin")
+        storage.create_book(title="Refactoring", author="Martin Fowler")
+        storage.create_book(title="1984", author="George Orwell")
+        storage.create_book(title="100% Pure_Code", author="Back\\Slash")
+
+        queries = ["clean", "CODE", "martin", "n c", "19", "a", "zzz", "' OR 1=1"]
+        # Спецсимволы LIKE ищутся буквально, а не как шаблон
+        queries += ["%", "_", "\\", "0%", "e_c", "%pure_"]
+        for query in queries:
+            found = [b.id for b in storage.search_books(query)]
+            assert found == _naive_search(storage, query)
+
+    def test_follows_update_and_delete(self, storage):
+        book = storage.create_book(title="Dune", author="Frank Herbert")
+
+        storage.update_book(book.id, title="Children of Dune")
+        assert [b.id for b in storage.search_books("children")] == [book.id]
+
+        storage.update_book(book.id, author="Brian Herbert")
+        assert storage.search_books("frank") == []
+
+        storage.delete_book(book.id)
+        assert storage.search_books("dune") == []
+
+
+class TestStatuses:
+    """Пакетная смена статусов"""
+
+    def test_sequential_transitions(self, storage):
+        a = storage.create_book(title="A", author="A")
+        b = storage.create_book(title="B", author="B")
+
+        outcomes = storage.update_statuses(
+            [
+                (a.id, "in_progress"),
+                (a.id, "completed"),
+                (b.id, "completed"),
+                (999, "to_read"),
+            ],
+            validate_status_transition,
+        )
+
+        assert outcomes[:2] == [None, None]
+        assert outcomes[2] not in (None, STATUS_NOT_FOUND)
+        assert outcomes[3] == STATUS_NOT_FOUND
+        assert storage.get_book_by_id(a.id).status == "completed"
+        assert storage.get_book_by_id(b.id).status == "to_read"
+
+
+class TestGeneration:
+    """Поколение хранилища для ETag списка"""
+
+    def test_changes_on_every_write(self, storage):
+        seen = [storage.generation()]
+
+        book = storage.create_book(title="A", author="A")
+        seen.append(storage.generation())
+        storage.bulk_create_books([{"title": "B", "author": "B"}])
+        seen.append(storage.generation())
+        storage.update_book(book.id, title="A2")
+        seen.append(storage.generation())
+        storage.update_statuses([(book.id, "in_progress")], validate_status_transition)
+        seen.append(storage.generation())
+        storage.delete_book(book.id)
+        seen.append(storage.generation())
+
+        assert seen == sorted(seen) and len(set(seen)) == len(seen)
+
+    def test_stable_without_changes(self, storage):
+        storage.create_book(title="A", author="A")
+        before = storage.generation()
+
+        storage.get_all_books()
+        storage.update_book(999, title="missing")
+        storage.delete_book(999)
+
+        assert storage.generation() == before
@@ -0,0 +1,36 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+class TestStreamingList:
+    """Тесты потоковой выдачи списка книг"""
+
+    def test_stream_json_array(self):
+        """stream=true отдаёт тот же JSON, что и обычный запрос"""
+        client.post("/api/v1/books", json={"title": "Stream", "author": "A"})
+
+        full = client.get("/api/v1/books").json()
+        response = client.get("/api/v1/books", params={"stream": "true"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/json")
+        assert response.json() == full
+
+    def test_stream_ndjson(self):
+        """Accept: application/x-ndjson — по одной книге на строку"""
+        client.post("/api/v1/books", json={"title": "Ndjson", "author": "A"})
+
+        full = client.get("/api/v1/books").json()
+        response = client.get(
+            "/api/v1/books", headers={"Accept": "application/x-ndjson"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = response.text.splitlines()
+        assert [json.loads(line) for line in lines] == full